@@ -0,0 +1,26 @@
+from contextlib import contextmanager
+from pathlib import Path
+import tempfile
+import os
+
+
+@contextmanager
+def atomicPath(path:Path):
+    """give a temporary path next to a file, renamed to it once the block ends without error and removed otherwise,
+    so readers never see a partially written file"""
+    fileDescriptor, tempPath = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".part")
+    os.close(fileDescriptor)
+    try:
+        yield Path(tempPath)
+        os.replace(tempPath, path)
+    except BaseException:
+        if os.path.exists(tempPath):
+            os.remove(tempPath)
+        raise
+
+
+def atomicWrite(path:Path, content:bytes):
+    """write a file through a temporary file then rename it"""
+    with atomicPath(path) as tempPath:
+        with open(tempPath, "wb") as f:
+            f.write(content)
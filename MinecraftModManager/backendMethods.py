@@ -1,4 +1,4 @@
-import translate
+import translate, httpClient, thumbnailStore, metadataStore, jarStore, profileManifest, htmlSanitizer, atomicFiles  # local modules
 from usefulVariables import *  # local variables
 import locale
 from packaging.version import Version
@@ -6,17 +6,19 @@ from pathlib import Path
 import PyQt5.QtWidgets as Qt
 from PyQt5.QtWidgets import QMessageBox
 from PyQt5 import QtCore, QtGui
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict, deque
 from datetime import datetime
 import minecraft_launcher_lib
 import traceback
+import markdown
+import hashlib
 import platformdirs
 import threading
 import subprocess
 import requests
 import logging
 import shutil
-import glob
 import json
 import time
 import os
@@ -38,11 +40,116 @@ log = logging.getLogger(__name__)
 
 class Start():
     """a class that setups the software before launching the interface"""
-    def start(self):
-        """code to directly execute at the start of the program"""
+    def start(self, methods:"Methods"):
+        """code to directly execute at the start of the program, with the methods instance of the app"""
         profilesDir.mkdir(parents=True, exist_ok=True)
         cacheDir.mkdir(parents=True, exist_ok=True)
         minecraftModsPath.mkdir(parents=True, exist_ok=True)
+        jarStore.Jars.prune(profileManifest.Manifests.referencedJars())
+        self.modsRestoreFailed = False  # told to the user once the interface is shown
+        if modsSwapMarker.exists():
+            log.warning("the app was closed while the game was running, restoring the previous mods")
+            self.modsRestoreFailed = not methods.restorePreviousMods()
+
+
+class IconDownloader(QtCore.QObject):
+    iconReady = QtCore.pyqtSignal(str, str)  # platform and id of the mod whose icon download ended, emitted from the download threads
+    def __init__(self, methods:"Methods", maxWorkers:int=iconDownloadWorkers):
+        """download mod icons on a fixed number of threads, downloading only once an icon requested several times"""
+        super().__init__()
+        self.methods = methods
+        self.executor = ThreadPoolExecutor(max_workers=maxWorkers, thread_name_prefix="icons")
+        self.lock = threading.Lock()
+        self.pendingCallbacks = {}  # (platform, id) of the icons being downloaded -> functions to call once done
+        self.iconReady.connect(self.onIconReady)
+    
+    def request(self, platform:str, id:str, iconUrl:str, callback=None):
+        """download the icon of a mod in the background, then call the callback on the GUI thread"""
+        if not iconUrl or thumbnailStore.Thumbnails.has(platform, id):
+            return  # nothing to download
+        key = (platform.lower(), str(id))
+        with self.lock:
+            if key in self.pendingCallbacks:  # already being downloaded, only wait for it
+                if callback:
+                    self.pendingCallbacks[key].append(callback)
+                return
+            self.pendingCallbacks[key] = [callback] if callback else []
+        self.executor.submit(self.download, key, iconUrl)
+    
+    def download(self, key:tuple, iconUrl:str):
+        """download an icon in a download thread and tell the GUI thread when it's done"""
+        try:
+            self.methods.downloadIcon(key[0], key[1], iconUrl)
+        except Exception as e:
+            log.error(f"error while downloading icon of mod {key[1]} on {key[0]} : {e}")
+        self.iconReady.emit(*key)
+    
+    def onIconReady(self, platform:str, id:str):
+        """call the callbacks waiting for an icon, on the GUI thread"""
+        with self.lock:
+            callbacks = self.pendingCallbacks.pop((platform, id), [])
+        for callback in callbacks:
+            try:
+                callback()
+            except RuntimeError:  # the widget was deleted during the download
+                pass
+
+
+class Prefetcher():
+    def __init__(self, methods:"Methods", maxWorkers:int=prefetchWorkers):
+        """get in the background the data, description and versions of the mods likely to be selected next, on a few threads,
+        so selecting them doesn't wait for the network"""
+        self.methods = methods
+        self.executor = ThreadPoolExecutor(max_workers=maxWorkers, thread_name_prefix="prefetch")
+        self.pagesExecutor = ThreadPoolExecutor(max_workers=prefetchPageRequests, thread_name_prefix="prefetchPages")  # never delays the pages the user waits for
+        self.lock = threading.Lock()
+        self.queue = deque()  # (platform, id, modloader, only compatible, minecraft version, hovered) of the mods to prefetch, the most wanted first
+        self.queued = set()  # (platform, id) of the mods waiting in the queue
+    
+    def prefetch(self, mods:list, modloader:str, onlyCompatible:bool, mcVersion:str, first:bool=False):
+        """queue mods to prefetch, in front of the others if first, dropping the oldest ones first put in front when the queue is full"""
+        tasks = []
+        with self.lock:
+            for modData in (reversed(mods) if first else mods):
+                key = (modData["platform"].lower(), str(modData["id"]))
+                if key in self.queued:
+                    if not first:
+                        continue
+                    self.queue = deque(task for task in self.queue if task[:2] != key)  # move it in front
+                else:
+                    self.queued.add(key)
+                    tasks.append(key)
+                task = (*key, modloader, onlyCompatible, mcVersion, first)
+                if first:
+                    self.queue.appendleft(task)
+                else:
+                    self.queue.append(task)
+            while len(self.queue) > prefetchQueueSize:
+                dropped = next((task for task in reversed(self.queue) if task[5]), self.queue[-1])  # the oldest hovered mod, else the last one
+                self.queue.remove(dropped)
+                self.queued.discard(dropped[:2])
+        for _ in tasks:  # each worker takes the most wanted mod when it starts, not the one it was submitted for
+            self.executor.submit(self.work)
+    
+    def cancel(self):
+        """forget the mods waiting to be prefetched, those being prefetched are finished"""
+        with self.lock:
+            self.queue.clear()
+            self.queued.clear()
+    
+    def work(self):
+        """prefetch the first mod of the queue in a prefetch thread"""
+        with self.lock:
+            if not self.queue:
+                return  # cancelled
+            platform, modId, modloader, onlyCompatible, mcVersion, _ = self.queue.popleft()
+            self.queued.discard((platform, modId))
+        try:
+            self.methods.getModDescription(modId, platform)  # also stores the data of the mod
+            self.methods.getVersionsList(modId, platform, modloader, onlyCompatible, mcVersion, self.pagesExecutor)
+            log.debug(f"prefetched mod {modId} on {platform}")
+        except Exception as e:
+            log.error(f"error while prefetching mod {modId} on {platform} : {e}")
 
 
 class Methods():
@@ -50,13 +157,21 @@ class Methods():
         """a class containing usefull methods"""
         self.curseforgeModloaders = {"fabric": 4, "forge": 1, "neoforge": 6, "quilt": 5}
         self.curseforgeReleases = {1: "release", 2: "beta", 3: "alpha"}
+        self.curseforgeHashAlgorithms = {1: "sha1", 2: "md5"}
+        self.curseforgeRequiredRelation = 3  # relation type of the required dependencies of a file
+        self.platformsExecutor = ThreadPoolExecutor(max_workers=len(availablePlatforms), thread_name_prefix="platforms")  # to query every platform at the same time
+        self.versionsIndexes = {}  # (platform, mod id) -> versions index, to avoid reading them again from the store
+        self.pagesExecutor = ThreadPoolExecutor(max_workers=parallelPageRequests, thread_name_prefix="pages")  # only for single requests, never for tasks waiting on it
+        self.searchCache = OrderedDict()  # (platform, query, modloader, version, only compatible) -> search, from the least recently used
+        self.projectLocks = {}  # (platform, mod id) -> lock held while its data or versions are requested, so they are only requested once at a time
+        self.projectLocksLock = threading.Lock()
 
     def curseforgeRequest(self, endpoint, **params) -> dict:
         """make a generic request to the curseforge api via the proxy containing the api key"""
         url = f"{curseForgeApi}/{endpoint}"
 
         try:
-            response = requests.get(url, params=params)
+            response = httpClient.Http.get(url, params=params)
             response.raise_for_status()  # check if response is valid
             if response.status_code != 200:
                 log.warning(f"got status code {response.status_code} while requesting curseforge proxy\nusing endpoint '{endpoint}' with params {params}")
@@ -65,13 +180,27 @@ class Methods():
             log.error(f"error while requesting to curseforge proxy : {e}\nusing endpoint '{endpoint}' with params {params}")
             return None
     
-    def curseforgeSearchMod(self, query:str, modloader:str, onlyCompatible:bool=False, version:str=None, nbResults:int=50) -> dict:
-        """search for a mod on curseforge"""
+    def curseforgePostRequest(self, endpoint:str, body:dict) -> dict:
+        """make a generic request with a json body to the curseforge api via the proxy, for the batch endpoints"""
+        url = f"{curseForgeApi}/{endpoint}"
+        try:
+            response = httpClient.Http.post(url, json=body)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            log.error(f"error while requesting to curseforge proxy : {e}\nusing endpoint '{endpoint}'")
+            return None
+    
+    def curseforgeSearchMod(self, query:str, modloader:str, onlyCompatible:bool=False, version:str=None, nbResults:int=50, offset:int=0) -> dict:
+        """search for a mod on curseforge, starting at an offset in the results"""
         if onlyCompatible:
-            result = self.curseforgeRequest(endpoint="mods/search", gameId=432, searchFilter=query, modLoaderType=self.curseforgeModloaders[modloader.lower()], pageSize=nbResults, classId=6, gameVersion=version)
+            result = self.curseforgeRequest(endpoint="mods/search", gameId=432, searchFilter=query, modLoaderType=self.curseforgeModloaders[modloader.lower()], pageSize=nbResults, index=offset, classId=6, gameVersion=version)
         else:
-            result = self.curseforgeRequest(endpoint="mods/search", gameId=432, searchFilter=query, modLoaderType=self.curseforgeModloaders[modloader.lower()], pageSize=nbResults, classId=6)
-        result = {"data": [mod for mod in result["data"] if mod["allowModDistribution"]]}  # filter out mods that don't allow distribution
+            result = self.curseforgeRequest(endpoint="mods/search", gameId=432, searchFilter=query, modLoaderType=self.curseforgeModloaders[modloader.lower()], pageSize=nbResults, index=offset, classId=6)
+        if result is None:
+            return None
+        result = {"data": [mod for mod in result["data"] if mod["allowModDistribution"]],  # filter out mods that don't allow distribution
+                  "received": len(result["data"]), "total": result["pagination"]["totalCount"]}
         log.info(f"searched for mod on curseforge: {query}")
         return result
 
@@ -79,7 +208,7 @@ class Methods():
         """directly make a generic request to the modrinth api"""
         url = f"{modrinthApi}/{endpoint}"
         try:
-            response = requests.get(url, params=params)
+            response = httpClient.Http.get(url, params=params)
             response.raise_for_status()
             if response.status_code != 200:
                 log.warning(f"got status code {response.status_code} while requesting curseforge proxy\nusing endpoint '{endpoint}' with params {params}")
@@ -88,21 +217,225 @@ class Methods():
             log.error(f"error while requesting to modrinth api : {e}\nusing endpoint '{endpoint}' with params {params}")
             return None
     
-    def modrinthSearchMod(self, query:str, modloader:str, onlyCompatible:bool=False, version:str=None, nbResults:int=100) -> dict:
-        """search for a mod on modrinth"""
+    def modrinthPostRequest(self, endpoint:str, body:dict) -> dict:
+        """make a generic request with a json body to the modrinth api, for the batch endpoints"""
+        url = f"{modrinthApi}/{endpoint}"
+        try:
+            response = httpClient.Http.post(url, json=body)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            log.error(f"error while requesting to modrinth api : {e}\nusing endpoint '{endpoint}'")
+            return None
+    
+    def modrinthSearchMod(self, query:str, modloader:str, onlyCompatible:bool=False, version:str=None, nbResults:int=100, offset:int=0) -> dict:
+        """search for a mod on modrinth, starting at an offset in the results"""
         if onlyCompatible:
-            result = self.modrinthRequest(endpoint="search", query=query, facets=f'[["categories:{modloader.lower()}"],["versions:{version}"]]', limit=nbResults)
+            result = self.modrinthRequest(endpoint="search", query=query, facets=f'[["categories:{modloader.lower()}"],["versions:{version}"]]', limit=nbResults, offset=offset)
         else:
-            result = self.modrinthRequest(endpoint="search", query=query, facets=f'[["categories:{modloader.lower()}"]]', limit=nbResults)
+            result = self.modrinthRequest(endpoint="search", query=query, facets=f'[["categories:{modloader.lower()}"]]', limit=nbResults, offset=offset)
+        if result is not None:
+            result["received"] = len(result["hits"])
+            result["total"] = result.get("total_hits", 0)
         log.info(f"searched for mod on modrinth: {query}")
         return result
 
-    def searchMod(self, query:str, platform:str, modloader:str, onlyCompatible:bool=False, version:str=None, nbResults:int=50) -> dict:
-        """search for a mod on a specific platform"""
+    def searchMod(self, query:str, platform:str, modloader:str, onlyCompatible:bool=False, version:str=None, nbResults:int=50, offset:int=0) -> dict:
+        """search for a mod on a specific platform, the result also has the number of hits received before filtering and the total number of hits"""
+        if platform.lower() == "modrinth":
+            return self.modrinthSearchMod(query, modloader.lower(), onlyCompatible, version, nbResults, offset)
+        elif platform.lower() == "curseforge":
+            return self.curseforgeSearchMod(query, modloader.lower(), onlyCompatible, version, nbResults, offset)
+    
+    def searchToMods(self, searchResult:dict, platform:str) -> list:
+        """convert a search result from any platform to a list of mods data"""
+        if searchResult is None:
+            return []
         if platform.lower() == "modrinth":
-            return self.modrinthSearchMod(query, modloader.lower(), onlyCompatible, version, nbResults)
+            return self.modrinthSearchToMods(searchResult)
         elif platform.lower() == "curseforge":
-            return self.curseforgeSearchMod(query, modloader.lower(), onlyCompatible, version, nbResults)
+            return self.curseforgeSearchToMods(searchResult)
+        log.error(f"platform {platform} is not supported, cannot convert search result")
+        return []
+    
+    def newSearch(self, query:str, platform:str, modloader:str, onlyCompatible:bool=False, version:str=None) -> dict:
+        """start a search on a platform, or on all of them with the 'all' platform, its pages are then requested with searchNextPage"""
+        platforms = availablePlatforms if platform.lower() == "all" else [platform.lower()]
+        return {"query": query, "modloader": modloader, "onlyCompatible": onlyCompatible, "version": version,
+                "platforms": {platform: {"offset": 0, "done": False} for platform in platforms},
+                "seenKeys": set(),  # (platform, id or name) of the mods already given, so pages merged from several platforms don't repeat them
+                "mods": [],  # all the mods of the pages already requested
+                "lock": threading.Lock(),  # held only to read or extend the mods, never during a request
+                "pageLock": threading.Lock(),  # only one page requested at a time
+                "createdAt": time.time()}
+    
+    def searchCacheKey(self, query:str, platform:str, modloader:str, onlyCompatible:bool, version:str) -> tuple:
+        """get the key of a search in the cache"""
+        return (platform.lower(), " ".join(query.lower().split()), modloader.lower(), version if onlyCompatible else None, onlyCompatible)
+    
+    def getSearch(self, query:str, platform:str, modloader:str, onlyCompatible:bool=False, version:str=None, fresh:bool=False) -> dict:
+        """get a search from the cache with the pages already requested, or start a new one if it isn't cached, too old, failed or fresh is asked,
+        only from the GUI thread"""
+        key = self.searchCacheKey(query, platform, modloader, onlyCompatible, version)
+        search = self.searchCache.get(key)
+        if not fresh and search is not None and time.time() - search["createdAt"] < searchCacheMaxAge and not search.get("offline") and not search.get("failed"):
+            self.searchCache.move_to_end(key)
+            return search
+        search = self.newSearch(query, platform, modloader, onlyCompatible, version)
+        self.searchCache[key] = search
+        self.searchCache.move_to_end(key)
+        while len(self.searchCache) > searchCacheSize:
+            self.searchCache.popitem(last=False)  # forget the least recently used search
+        return search
+    
+    def getSearchResults(self, search:dict) -> list:
+        """get all the mods of the pages already requested for a search"""
+        with search["lock"]:
+            return list(search["mods"])
+    
+    def filterCachedSearches(self, query:str, platform:str, modloader:str, onlyCompatible:bool=False, version:str=None) -> list:
+        """filter locally the mods of the cached search with the longest query this one starts with,
+        to show something before the results of this query arrive"""
+        platform, query, modloader, version, onlyCompatible = self.searchCacheKey(query, platform, modloader, onlyCompatible, version)
+        bestSearch = None
+        for (cachedPlatform, cachedQuery, cachedModloader, cachedVersion, cachedOnlyCompatible), search in self.searchCache.items():
+            if (cachedPlatform, cachedModloader, cachedVersion, cachedOnlyCompatible) != (platform, modloader, version, onlyCompatible):
+                continue
+            if cachedQuery != query and query.startswith(cachedQuery) and time.time() - search["createdAt"] < searchCacheMaxAge:
+                if bestSearch is None or len(cachedQuery) > len(bestSearch[0]):
+                    bestSearch = (cachedQuery, search)
+        if bestSearch is None:
+            return []
+        words = query.split()
+        mods = []
+        for mod in self.getSearchResults(bestSearch[1]):
+            text = f"{mod['name']} {mod['rawData'].get('slug') or ''} {mod['author'] or ''}".lower()
+            if all(word in text for word in words):
+                mods.append(mod)
+        return mods
+    
+    def searchNextPage(self, search:dict, pageSize:int) -> list:
+        """get the next page of mods data of a search, requesting the platforms at the same time and keeping it in the search, can be used from any thread"""
+        with search["pageLock"]:
+            mods = self.requestSearchPage(search, pageSize)
+            with search["lock"]:
+                search["mods"].extend(mods)
+        return mods
+    
+    def requestSearchPage(self, search:dict, pageSize:int) -> list:
+        """request the next page of a search on all its platforms that still have results"""
+        platforms = [platform for platform, cursor in search["platforms"].items() if not cursor["done"]]
+        futures = {platform: self.platformsExecutor.submit(self.searchPlatformPage, search, platform, pageSize) for platform in platforms}
+        modsLists = []
+        for platform, future in futures.items():
+            try:
+                modsLists.append(future.result())
+            except Exception as e:
+                search["platforms"][platform]["done"] = True
+                search["failed"] = True  # not kept in the cache, so it's requested again next time
+                log.error(f"error while searching for '{search['query']}' on {platform} : {e}")
+        return self.mergeSearchResults(modsLists, search["seenKeys"])
+    
+    def searchPlatformPage(self, search:dict, platform:str, pageSize:int) -> list:
+        """get the next page of mods of a search on one platform, requesting more hits when some were filtered out"""
+        cursor = search["platforms"][platform]
+        mods = []
+        for _ in range(searchMaxRequestsPerPage):
+            result = self.searchMod(search["query"], platform, search["modloader"], search["onlyCompatible"], search["version"], pageSize-len(mods), cursor["offset"])
+            if result is None:
+                if cursor["offset"] == 0:  # no answer from the platform, use the mods already seen instead
+                    mods = self.searchOffline(search["query"], platform, search["modloader"], search["onlyCompatible"], search["version"])
+                    search["offline"] = True  # not kept in the cache, so it's requested again next time
+                    log.info(f"no answer from {platform}, found {len(mods)} mods for '{search['query']}' offline")
+                else:
+                    search["failed"] = True  # the next pages are missing, not kept in the cache
+                cursor["done"] = True
+                break
+            pageMods = self.searchToMods(result, platform)
+            self.indexMods(pageMods)
+            mods.extend(pageMods)
+            cursor["offset"] += result["received"]
+            if result["received"] == 0 or cursor["offset"] >= min(result["total"], searchMaxOffset):
+                cursor["done"] = True
+                break
+            if len(mods) >= pageSize:
+                break
+        log.debug(f"got {len(mods)} mods for '{search['query']}' on {platform}, now at offset {cursor['offset']}")
+        return mods
+    
+    def searchOffline(self, query:str, platform:str, modloader:str, onlyCompatible:bool=False, version:str=None) -> list:
+        """search the mods already seen in searches and projects, without any request"""
+        platforms = availablePlatforms if platform.lower() == "all" else [platform.lower()]
+        return metadataStore.Metadata.searchMods(query, platforms, modloader, version if onlyCompatible else None, searchOfflineLimit)
+    
+    def indexMods(self, mods:list):
+        """index the mods of a search for the offline search, with their summary, loaders and game versions"""
+        entries = []
+        for mod in mods:
+            rawData = mod["rawData"]
+            if mod["platform"] == "modrinth":
+                entries.append({"mod": dict(mod, rawData={"slug": rawData.get("slug"), "icon_url": rawData.get("icon_url")}),
+                                "summary": rawData.get("description"), "loaders": rawData.get("categories", []), "gameVersions": rawData.get("versions", [])})
+            elif mod["platform"] == "curseforge":
+                entries.append(self.curseforgeSearchEntry(mod))
+        try:
+            metadataStore.Metadata.putSearchEntries(entries)
+        except Exception as e:
+            log.warning(f"unable to index mods for the offline search : {e}")
+    
+    def curseforgeSearchEntry(self, mod:dict) -> dict:
+        """get the offline search entry of a curseforge mod, whose loaders and game versions come from its latest files"""
+        rawData = mod["rawData"]
+        loaderNames = {loaderType: loader for loader, loaderType in self.curseforgeModloaders.items()}
+        filesIndexes = rawData.get("latestFilesIndexes", [])
+        return {"mod": dict(mod, rawData={"slug": rawData.get("slug"), "logo": {"thumbnailUrl": (rawData.get("logo") or {}).get("thumbnailUrl")}}),
+                "summary": rawData.get("summary"),
+                "loaders": list({loaderNames[fileIndex["modLoader"]] for fileIndex in filesIndexes if fileIndex.get("modLoader") in loaderNames}),
+                "gameVersions": list({fileIndex["gameVersion"] for fileIndex in filesIndexes})}
+    
+    def indexProject(self, modId:str, platform:str, modData:dict):
+        """index the data of a project for the offline search"""
+        if platform == "modrinth":
+            entry = {"mod": {"name": modData["title"], "author": "", "id": modData["id"], "platform": "modrinth", "rawData": {"slug": modData.get("slug"), "icon_url": modData.get("icon_url")}},
+                     "summary": modData.get("description"), "loaders": modData.get("loaders", []), "gameVersions": modData.get("game_versions", [])}
+        else:
+            entry = self.curseforgeSearchEntry(self.curseforgeSearchToMods({"data": [modData["data"]]})[0])
+        try:
+            metadataStore.Metadata.putSearchEntries([entry])
+        except Exception as e:
+            log.warning(f"unable to index mod {modId} for the offline search : {e}")
+    
+    def isSearchDone(self, search:dict) -> bool:
+        """check if all the results of a search were given"""
+        return all(cursor["done"] for cursor in search["platforms"].values())
+    
+    def mergeSearchResults(self, modsLists:list, seenKeys:set=None) -> list:
+        """merge lists of mods sorted by relevance into one ranked list, removing the mods found on several platforms or already in the seen keys,
+        the keys are (platform, key) so mods are only matched by name or slug against other platforms, and by id on their own"""
+        ranked = []
+        for modsList in modsLists:
+            for position, mod in enumerate(modsList):
+                ranked.append((position/len(modsList), mod))  # relative position so a shorter list isn't disadvantaged
+        ranked.sort(key=lambda item: item[0])  # stable sort, so ties keep the platforms order
+        mergedMods = []
+        seenKeys = set() if seenKeys is None else seenKeys
+        for _, mod in ranked:
+            platform = mod["platform"]
+            names = {self.normalizeModName(mod["name"])}
+            if mod["rawData"].get("slug"):
+                names.add(mod["rawData"]["slug"].lower())
+            if (platform, ("id", str(mod["id"]))) in seenKeys:
+                continue  # already given by an earlier page
+            if any((otherPlatform, name) in seenKeys for otherPlatform in availablePlatforms if otherPlatform != platform for name in names):
+                continue  # already found on another platform with a better rank
+            seenKeys.add((platform, ("id", str(mod["id"]))))
+            seenKeys.update((platform, name) for name in names)
+            mergedMods.append(mod)
+        return mergedMods
+    
+    def normalizeModName(self, name:str) -> str:
+        """get a simplified version of a mod name to compare mods between platforms"""
+        return "".join(char for char in name.lower() if char.isalnum())
     
     def listMcVersions(self, onlyReleases:bool=True) -> list:
         """returns a list of all the minecraft versions"""
@@ -114,149 +447,302 @@ class Methods():
         self.onlyMinecraftVersions = [version["id"] for version in self.filteredMcVersions]
         return self.onlyMinecraftVersions
 
-    def getProfiles(self) -> dict:
-        """get a dictionary of all the profiles and their properties"""
-        self.profiles = {}
-        for profile in [Path(item).name for item in glob.glob(str(profilesDir/"*"))]:
-            with open(profilesDir/profile/"properties.json", "r", encoding="utf-8") as f:
-                self.profiles[profile] = json.load(f)
-        return self.profiles
-    
     def modrinthSearchToMods(self, searchResult:dict) -> list:
-        """convert a search result from modrinth to a list of mods data with the name, author, id, platform and icon path in cache, and the complete raw data"""
-        iconCacheDir = cacheDir/"modIcons"/"modrinth"
-        self.mods = []
+        """convert a search result from modrinth to a list of mods data with the name, author, id, platform, and the complete raw data"""
+        mods = []  # not stored on self as searches can run concurrently
         for mod in searchResult["hits"]:
             if mod["project_type"] == "mod": # only accept mods, no modpacks
-                self.mods.append({"name": mod["title"], "author": mod["author"], "id": mod["project_id"], "platform": "modrinth", "icon": iconCacheDir/f"{mod['project_id']}.png", "rawData": mod})
-        return self.mods
+                mods.append({"name": mod["title"], "author": mod["author"], "id": mod["project_id"], "platform": "modrinth", "rawData": mod})
+        return mods
 
     def curseforgeSearchToMods(self, searchResult:dict) -> list:
-        """convert a search result from curseforge to a list of mods data with the name, author, id, platform and icon path in cache, and the complete raw data"""
-        iconCacheDir = cacheDir/"modIcons"/"curseforge"
-        self.mods = []
+        """convert a search result from curseforge to a list of mods data with the name, author, id, platform, and the complete raw data"""
+        mods = []  # not stored on self as searches can run concurrently
         for mod in searchResult["data"]:
             authors = ", ".join([author["name"] for author in mod["authors"]])
-            self.mods.append({"name": mod["name"], "author": authors, "id": str(mod["id"]), "platform": "curseforge", "icon": iconCacheDir/f"{mod['id']}.png", "rawData": mod})
-        return self.mods
-    
-    def downloadIcon(self, platform:str, id:str, iconUrl:str, modWidget=None):
-        """download the icon of a mod in cache, eventually updating the widget when downloaded"""
-        iconCacheDir = cacheDir/"modIcons"/platform.lower()
-        iconCacheDir.mkdir(parents=True, exist_ok=True)
-        if not (iconCacheDir/f"{id}.png").exists():
-            if iconUrl:  # if the mod has an icon
-                with open(iconCacheDir/f"{id}.png", "wb") as f:
-                    f.write(requests.get(iconUrl).content)
-                if modWidget:
-                    modWidget.updateIcon()
-
+            mods.append({"name": mod["name"], "author": authors, "id": str(mod["id"]), "platform": "curseforge", "rawData": mod})
+        return mods
+    
+    def downloadIcon(self, platform:str, id:str, iconUrl:str):
+        """download the icon of a mod and store its thumbnails if they aren't already stored"""
+        if not iconUrl or thumbnailStore.Thumbnails.has(platform, id):
+            return
+        try:
+            response = httpClient.Http.get(iconUrl)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            log.error(f"error while downloading icon of mod {id} on {platform} : {e}")
+            return
+        thumbnailStore.Thumbnails.store(platform, id, response.content)
+    
     def getModInfos(self, modId:str, platform:str) -> dict:
-        """do a request to get every informations about a mod"""
-        if platform.lower() == "modrinth":
-            return self.modrinthRequest(f"project/{modId}")
-        elif platform.lower() == "curseforge":
-            return self.curseforgeRequest(f"mods/{modId}")
+        """get every informations about a mod, from the store when they're recent enough, can be used from any thread"""
+        return self.getStoredModInfos(modId, platform)[0]
+    
+    def requestModInfos(self, modId:str, platform:str, validators:dict=None) -> tuple:
+        """request the data of a mod, only sent back if it changed when the validators of the stored data are given,
+        returns the data (None if it didn't change or on error), the validators of the response and whether it didn't change"""
+        if platform == "modrinth":
+            url = f"{modrinthApi}/project/{modId}"
+        elif platform == "curseforge":
+            url = f"{curseForgeApi}/mods/{modId}"
+        else:
+            log.error(f"platform {platform} is not supported, cannot get mod infos")
+            return None, None, False
+        headers = {}
+        if validators and validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators and validators.get("lastModified"):
+            headers["If-Modified-Since"] = validators["lastModified"]
+        try:
+            response = httpClient.Http.get(url, headers=headers)
+            if response.status_code == 304:
+                return None, validators, True
+            response.raise_for_status()
+            return response.json(), {"etag": response.headers.get("ETag"), "lastModified": response.headers.get("Last-Modified")}, False
+        except requests.exceptions.RequestException as e:
+            log.error(f"error while requesting the data of mod {modId} on {platform} : {e}")
+            return None, None, False
     
     def cleanHtml(self, html:str) -> str:
         """clean an html string from all the links and images, replacing them with a textual version"""
-        soup = BeautifulSoup(html, "html.parser")
-        for a in soup.find_all("a"):
-            p = soup.new_string(a.get_text())
-            p.string = a.get_text()
-            a.replace_with(p)
-        for img in soup.find_all("img"):
-            img.decompose()
-        return str(soup)
+        return htmlSanitizer.sanitizeHtml(html)
+    
+    def getStoredDescription(self, modId:str, platform:str) -> str:
+        """get the description of a mod rendered the last time it was shown, without any request, or None if it never was"""
+        stored = metadataStore.Metadata.getDescription(platform.lower(), modId)
+        return stored[0] if stored else None
+    
+    def getModDescription(self, modId:str, platform:str) -> str:
+        """get the description of a mod as clean html, rendering it only when its content changed since the last time, can be used from any thread"""
+        platform = platform.lower()
+        modData = self.getModInfos(modId, platform)
+        if modData is None:
+            return None
+        store = metadataStore.Metadata
+        stored = store.getDescription(platform, modId)
+        if platform == "modrinth":
+            source = modData["body"]
+            sourceVersion = hashlib.sha1(source.encode("utf-8")).hexdigest()
+        else:  # curseforge gives the description apart, only request it again when the mod was modified
+            sourceVersion = modData["data"].get("dateModified", "")
+        if stored is not None and stored[1] == sourceVersion:
+            return stored[0]
+        if platform == "curseforge":
+            result = self.curseforgeRequest(f"mods/{modId}/description")
+            if result is None:
+                return stored[0] if stored else None
+            source = result["data"]
+        contentHash = hashlib.sha1(source.encode("utf-8")).hexdigest()
+        if stored is not None and stored[2] == contentHash:
+            html = stored[0]
+        else:
+            html = self.cleanHtml(markdown.markdown(source) if platform == "modrinth" else source)
+            log.debug(f"rendered the description of mod {modId} on {platform}")
+        store.putDescription(platform, modId, sourceVersion, contentHash, html)
+        return html
     
     def getVersionsInfos(self, modId:str, platform:str, modloader:str, onlyCompatible:bool=False, mcVersion:str=None) -> dict:
-        """get a dictionary of all the versions of a mod with version as key,
+        """get a dictionary of all the versions of a mod with the version id as key, from the newest,
         then the minecraft versions, version id, the mod id, the platform, the modloader, the release type, the download url and the filename"""
-        self.modVersions = {}
-        self.modVersionsData = []
-        self.modVersionThreads = []
-
-        versionsDataCache = cacheDir/"modsVersions"/platform.lower()/modId
-        modsDataCache = cacheDir/"modsData"/platform.lower()
-        modsDataCache.mkdir(parents=True, exist_ok=True)
+        self.modVersions = {str(entry["versionId"]): entry for entry in self.getVersionsList(modId, platform, modloader, onlyCompatible, mcVersion)}
+        return self.modVersions
+    
+    def getVersionsList(self, modId:str, platform:str, modloader:str, onlyCompatible:bool=False, mcVersion:str=None, pagesExecutor:ThreadPoolExecutor=None) -> list:
+        """get the entries of the versions of a mod for a modloader sorted from the newest, with the modloader, can be used from any thread,
+        the pages of versions are requested on the given executor, by default the one of the requests the user waits for"""
+        platform = platform.lower()
+        modloader = modloader.lower()
+        pagesExecutor = pagesExecutor or self.pagesExecutor
 
-        if platform.lower() == "modrinth":
-            # either request and save or load the mod data
-            if (modsDataCache/f"{modId}.json").exists():
-                with open(modsDataCache/f"{modId}.json", "r", encoding="utf-8") as f:
-                    modData = json.load(f)
-            else:
-                modData = self.getModInfos(modId, platform.lower())
-                with open(modsDataCache/f"{modId}.json", "w", encoding="utf-8") as f:
-                    json.dump(modData, f, indent=4)
-            
-            versionsIds = modData["versions"]
-            if (versionsDataCache).exists():
-                self.modVersionsData = [json.load(open(versionsDataCache/f"{versionId}.json", "r", encoding="utf-8")) for versionId in versionsIds if (versionsDataCache/f"{versionId}.json").exists()]
-            else:
-                versionsDataCache.mkdir(parents=True, exist_ok=True)
-                self.modVersionsData = self.modrinthRequest("versions", ids=str(versionsIds).replace("'", '"'))
-                for versionData in self.modVersionsData:
-                    with open(versionsDataCache/f"{versionData['id']}.json", "w", encoding="utf-8") as f:
-                        json.dump(versionData, f, indent=4)
-            
-            self.modVersionsData.sort(key=lambda data: datetime.fromisoformat(data["date_published"].replace("Z", "")), reverse=True)
-            for versionData in self.modVersionsData:
-                if modloader.lower() in versionData["loaders"]:
-                    if onlyCompatible:
-                        if mcVersion not in versionData["game_versions"]:
-                            continue
-                    self.modVersions[versionData["version_number"]] = {"mcVersions": versionData["game_versions"],
-                                                                       "versionId": versionData["id"],
-                                                                       "modId": modId, "platform": platform.lower(), "modloader": modloader.lower(),
-                                                                       "releaseType": versionData["version_type"],
-                                                                       "downloadUrl": versionData["files"][0]["url"],
-                                                                       "fileName": versionData["files"][0]["filename"],
-                                                                       "versionName": versionData["version_number"],
-                                                                       "modName": modData["title"],
-                                                                       "iconUrl": modData["icon_url"]}
-        elif platform.lower() == "curseforge":
-            # either request and save or load the mod data
-            if (modsDataCache/f"{modId}.json").exists():
-                with open(modsDataCache/f"{modId}.json", "r", encoding="utf-8") as f:
-                    modData = json.load(f)
-            else:
-                modData = self.getModInfos(modId, platform.lower())
-                with open(modsDataCache/f"{modId}.json", "w", encoding="utf-8") as f:
-                    json.dump(modData, f, indent=4)
+        with self.projectLock(platform, modId):  # a mod selected while it's prefetched waits for its versions instead of requesting them again
+            modData, refreshed = self.getStoredModInfos(modId, platform)
+            if modData is None:
+                log.error(f"unable to get the data of mod {modId} on {platform}, cannot get versions infos")
+                return []
 
-            versionsIds = [modVersion["fileId"] for modVersion in modData["data"]["latestFilesIndexes"]]
-            if (versionsDataCache).exists():
-                self.modVersionsData = [json.load(open(versionsDataCache/f"{versionId}.json", "r", encoding="utf-8")) for versionId in versionsIds if (versionsDataCache/f"{versionId}.json").exists()]
+            if platform == "modrinth":
+                newVersionsCount = self.syncModrinthVersions(modId, modData["versions"], pagesExecutor)
+            elif platform == "curseforge":
+                if refreshed or not metadataStore.Metadata.getVersionIds(platform, modId):  # the files list isn't part of the project data, only look for new ones from time to time
+                    newVersionsCount = self.syncCurseforgeVersions(modId, pagesExecutor)
+                else:
+                    newVersionsCount = 0
             else:
-                versionsDataCache.mkdir(parents=True, exist_ok=True)
-                index = 0
-                self.modVersionsData = []
-                while index < len(versionsIds):
-                    self.modVersionsData.extend([{"data": version} for version in self.curseforgeRequest(f"mods/{modId}/files", pageSize=50, index=index)["data"]])
-                    index += 50
-                for versionData in self.modVersionsData:
-                    with open(versionsDataCache/f"{versionData['data']['id']}.json", "w", encoding="utf-8") as f:
-                        json.dump(versionData, f, indent=4)
+                log.error(f"platform {platform} is not supported, cannot get versions infos")
+                return []
 
-            self.modVersionsData.sort(key=lambda data: datetime.fromisoformat(data["data"]["fileDate"].replace("Z", "")), reverse=True)
-            for versionData in self.modVersionsData:
-                if modloader.lower() in [version.lower() for version in versionData["data"]["gameVersions"]]:
-                    if onlyCompatible:
-                        if mcVersion not in versionData["data"]["gameVersions"]:
-                            continue
-                    self.modVersions[versionData["data"]["displayName"]] = {"mcVersions": [mcVersion["gameVersion"] for mcVersion in versionData["data"]["sortableGameVersions"] if mcVersion["gameVersion"]],
-                                                                "versionId": versionData["data"]["id"],
-                                                                "modId": modId, "platform": platform.lower(), "modloader": modloader.lower(),
-                                                                "releaseType": self.curseforgeReleases[versionData["data"]["releaseType"]],
-                                                                "downloadUrl": versionData["data"]["downloadUrl"],
-                                                                "fileName": versionData["data"]["fileName"],
-                                                                "versionName": versionData["data"]["displayName"],
-                                                                "modName": modData["data"]["name"],
-                                                                "iconUrl": modData["data"]["logo"]["thumbnailUrl"] if "logo" in modData["data"] else None}
+            index = self.getVersionsIndex(modId, platform, modData, rebuild=refreshed or newVersionsCount > 0)
+        if onlyCompatible:
+            versionsIds = index["byLoaderVersion"].get(modloader, {}).get(mcVersion, [])
         else:
-            log.error(f"platform {platform} is not supported, cannot get versions infos")
-        return self.modVersions
+            versionsIds = index["byLoader"].get(modloader, [])
+        return [dict(index["entries"][versionId], modloader=modloader) for versionId in versionsIds]
+    
+    def getVersionsIndex(self, modId:str, platform:str, modData:dict, rebuild:bool=False) -> dict:
+        """get the index of the versions of a mod from memory or the store, building it again if needed"""
+        key = (platform, str(modId))
+        if not rebuild:
+            if key in self.versionsIndexes:
+                return self.versionsIndexes[key]
+            index = metadataStore.Metadata.getVersionIndex(platform, modId, versionsIndexFormat)
+            if index is not None:
+                self.versionsIndexes[key] = index
+                return index
+        index = self.buildVersionsIndex(modId, platform, modData)
+        metadataStore.Metadata.putVersionIndex(platform, modId, versionsIndexFormat, index)
+        self.versionsIndexes[key] = index
+        return index
+    
+    def expireVersions(self, platform:str, modId:str):
+        """forget the versions index of a mod and make its data revalidated at the next read, after a new version was found elsewhere"""
+        with self.projectLock(platform, modId):
+            self.versionsIndexes.pop((platform, str(modId)), None)
+            metadataStore.Metadata.deleteVersionIndex(platform, modId)
+            metadataStore.Metadata.expireProject(platform, modId)
+    
+    def buildVersionsIndex(self, modId:str, platform:str, modData:dict) -> dict:
+        """build an index of the stored versions of a mod, with the entries of every version,
+        and their ids sorted from the newest by modloader and by modloader then minecraft version"""
+        entries = {}
+        dates = {}
+        loaders = {}  # version id -> modloaders
+        gameVersions = {}  # version id -> minecraft versions
+        if platform == "modrinth":
+            versionsIds = set(modData["versions"])
+            for versionData in metadataStore.Metadata.getVersions(platform, modId):
+                if versionData["id"] not in versionsIds:
+                    continue  # deleted version
+                versionId = versionData["id"]
+                dates[versionId] = datetime.fromisoformat(versionData["date_published"].replace("Z", ""))
+                loaders[versionId] = versionData["loaders"]
+                gameVersions[versionId] = versionData["game_versions"]
+                entries[versionId] = self.modrinthVersionEntry(versionData, modId, modData["title"], modData["icon_url"])
+        elif platform == "curseforge":
+            for versionData in metadataStore.Metadata.getVersions(platform, modId):
+                versionId = str(versionData["data"]["id"])
+                dates[versionId] = datetime.fromisoformat(versionData["data"]["fileDate"].replace("Z", ""))
+                lowerGameVersions = [version.lower() for version in versionData["data"]["gameVersions"]]
+                loaders[versionId] = [loader for loader in self.curseforgeModloaders if loader in lowerGameVersions]
+                gameVersions[versionId] = versionData["data"]["gameVersions"]
+                entries[versionId] = self.curseforgeVersionEntry(versionData["data"], modId, modData["data"]["name"], modData["data"]["logo"]["thumbnailUrl"] if "logo" in modData["data"] else None)
+        order = sorted(entries, key=lambda versionId: dates[versionId], reverse=True)
+        byLoader = {}
+        byLoaderVersion = {}
+        for versionId in order:
+            for loader in loaders[versionId]:
+                byLoader.setdefault(loader, []).append(versionId)
+                for gameVersion in gameVersions[versionId]:
+                    byLoaderVersion.setdefault(loader, {}).setdefault(gameVersion, []).append(versionId)
+        return {"entries": entries, "byLoader": byLoader, "byLoaderVersion": byLoaderVersion}
+    
+    def modrinthVersionEntry(self, versionData:dict, modId:str, modName:str, iconUrl:str) -> dict:
+        """convert the data of a modrinth version to the version entry used everywhere in the app, without the modloader"""
+        primaryFile = next((file for file in versionData["files"] if file.get("primary")), versionData["files"][0])
+        return {"mcVersions": versionData["game_versions"],
+                "versionId": versionData["id"],
+                "modId": modId, "platform": "modrinth",
+                "releaseType": versionData["version_type"],
+                "downloadUrl": primaryFile["url"],
+                "fileName": primaryFile["filename"],
+                "fileSize": primaryFile.get("size"),
+                "hashes": {algorithm: value for algorithm, value in primaryFile.get("hashes", {}).items() if algorithm in ("sha1", "sha512")},
+                "versionName": versionData["version_number"],
+                "modName": modName,
+                "iconUrl": iconUrl,
+                "dependencies": [{"modId": dependency.get("project_id"), "versionId": dependency.get("version_id")}
+                                 for dependency in versionData.get("dependencies", []) if dependency.get("dependency_type") == "required"]}
+    
+    def curseforgeVersionEntry(self, fileData:dict, modId:str, modName:str, iconUrl:str) -> dict:
+        """convert the data of a curseforge file to the version entry used everywhere in the app, without the modloader"""
+        return {"mcVersions": [mcVersion["gameVersion"] for mcVersion in fileData["sortableGameVersions"] if mcVersion["gameVersion"]],
+                "versionId": fileData["id"],
+                "modId": modId, "platform": "curseforge",
+                "releaseType": self.curseforgeReleases[fileData["releaseType"]],
+                "downloadUrl": fileData["downloadUrl"],
+                "fileName": fileData["fileName"],
+                "fileSize": fileData.get("fileLength"),
+                "hashes": {self.curseforgeHashAlgorithms[fileHash["algo"]]: fileHash["value"] for fileHash in fileData.get("hashes", []) if fileHash["algo"] in self.curseforgeHashAlgorithms},
+                "versionName": fileData["displayName"],
+                "modName": modName,
+                "iconUrl": iconUrl,
+                "dependencies": [{"modId": str(dependency["modId"]), "versionId": None}
+                                 for dependency in fileData.get("dependencies", []) if dependency["relationType"] == self.curseforgeRequiredRelation]}
+    
+    def getStoredModInfos(self, modId:str, platform:str) -> tuple:
+        """get the data of a mod from the store, revalidating it with a conditional request if it's too old, can be used from any thread,
+        returns the data and whether it changed"""
+        platform = platform.lower()
+        store = metadataStore.Metadata
+        with self.projectLock(platform, modId):  # the threads showing a mod wait for a single request
+            entry = store.getProjectEntry(platform, modId)
+            if entry is not None and time.time() - entry[1] < metadataMaxAge:
+                return entry[0], False
+            modData, validators, unchanged = self.requestModInfos(modId, platform, entry[2] if entry else None)
+            if unchanged:
+                store.touchProject(platform, modId)
+                return entry[0], False
+            if modData is None:
+                if entry is not None:
+                    log.warning(f"unable to refresh the data of mod {modId} on {platform}, using the stored one")
+                    return entry[0], False
+                return None, False
+            store.putProject(platform, modId, modData, validators)
+        self.indexProject(modId, platform, modData)
+        return modData, True
+    
+    def projectLock(self, platform:str, modId:str) -> threading.RLock:
+        """get the lock held while the data or the versions of a mod are requested"""
+        with self.projectLocksLock:
+            return self.projectLocks.setdefault((platform, str(modId)), threading.RLock())
+    
+    def syncModrinthVersions(self, modId:str, versionsIds:list, pagesExecutor:ThreadPoolExecutor):
+        """request and store only the versions of a modrinth mod that aren't already stored, in parallel chunks to keep the urls short,
+        returns the number of new versions"""
+        store = metadataStore.Metadata
+        storedIds = store.getVersionIds("modrinth", modId)
+        missingIds = [versionId for versionId in versionsIds if versionId not in storedIds]
+        chunks = [missingIds[index:index+modrinthVersionsBatchSize] for index in range(0, len(missingIds), modrinthVersionsBatchSize)]
+        newVersions = {}
+        for versionsData in pagesExecutor.map(lambda chunk: self.modrinthRequest("versions", ids=json.dumps(chunk)), chunks):
+            if versionsData is None:
+                continue  # will be requested again at the next sync
+            newVersions.update({versionData["id"]: versionData for versionData in versionsData})
+        store.putVersions("modrinth", modId, newVersions)
+        if newVersions:
+            log.info(f"synced {len(newVersions)} new versions of mod {modId} on modrinth")
+        return len(newVersions)
+    
+    def syncCurseforgeVersions(self, modId:str, pagesExecutor:ThreadPoolExecutor):
+        """request the files of a curseforge mod, only the first page if it's enough to know every file, else all the other pages in parallel,
+        the stored files not found in a complete walk were deleted upstream and are removed, returns the number of new and removed versions"""
+        store = metadataStore.Metadata
+        storedIds = store.getVersionIds("curseforge", modId)
+        firstPage = self.curseforgeRequest(f"mods/{modId}/files", pageSize=curseforgeFilesPageSize, index=0)
+        if firstPage is None:
+            return 0
+        pages = [firstPage]
+        totalCount = firstPage["pagination"]["totalCount"]
+        newIds = {str(version["id"]) for version in firstPage["data"]} - storedIds
+        walked = len(storedIds) + len(newIds) != totalCount  # files are missing further in the list, or stored ones were deleted
+        if walked:
+            indexes = range(curseforgeFilesPageSize, totalCount, curseforgeFilesPageSize)
+            pages.extend(pagesExecutor.map(lambda index: self.curseforgeRequest(f"mods/{modId}/files", pageSize=curseforgeFilesPageSize, index=index), indexes))
+        newVersions = {}
+        foundIds = set()
+        for page in pages:
+            if page is None:
+                continue  # will be requested again at the next sync
+            foundIds.update(str(version["id"]) for version in page["data"])
+            newVersions.update({str(version["id"]): {"data": version} for version in page["data"] if str(version["id"]) not in storedIds})
+        store.putVersions("curseforge", modId, newVersions)
+        deletedIds = set()
+        if walked and None not in pages:  # only a complete walk tells which files don't exist anymore
+            deletedIds = storedIds - foundIds
+            store.deleteVersions("curseforge", deletedIds)
+        if newVersions or deletedIds:
+            log.info(f"synced {len(newVersions)} new and {len(deletedIds)} deleted versions of mod {modId} on curseforge")
+        return len(newVersions) + len(deletedIds)
     
     def removeCurrentMod(self, profile:str, modId:str, platform:str, auto:bool=False):
         """remove the currently selected mod"""
@@ -267,19 +753,19 @@ class Methods():
                 if confirm == QMessageBox.No:
                     return -1  # removal cancelled
             shutil.rmtree(currentModPath)
+            profileManifest.Manifests.removeMod(profile, platform, modId)
             log.info(f"Removed mod at {currentModPath}")
             if not auto:
                 QMessageBox.information(None, lang("success"), lang("modRemoved"))
         else:
             log.warning(f"Mod at {currentModPath} not found")
 
-    def installCurrentMod(self, profile:str, modId:str, platform:str, modVersionData:str):
-        """install the currently selected mod"""
-        #TODO: put a window during download
+    def confirmModInstall(self, profile:str, modId:str, platform:str, modVersionData:dict) -> bool:
+        """check if the selected mod version can be installed, asking the user before replacing another version"""
         if modVersionData is None:
             log.warning("No mod version data provided, cannot install the mod")
             QMessageBox.warning(None, lang("error"), lang("noVersionSelected"))
-            return
+            return False
         currentModPath = profilesDir/profile/platform.lower()/modId
         # check if the mod is already installed
         if os.path.exists(currentModPath):
@@ -287,38 +773,212 @@ class Methods():
             if previousVersionId != modVersionData["versionId"]:  # if the mod is already installed but with a different version
                 confirm = QMessageBox.question(None, lang("updateMod"), lang("updateModConfirm"), QMessageBox.Yes | QMessageBox.No)
                 if confirm == QMessageBox.No:
-                    return -1
+                    return False
                 log.warning(f"Mod at {currentModPath} already installed, updating")
-                self.removeCurrentMod(profile, modId, platform, auto=True)
             else:
-                return # the mod is already installed with the same version
-        QMessageBox.information(None, lang("success"), lang("modInstalled"))
-        # install the mod
+                return False  # the mod is already installed with the same version
+        return True
+
+    def installCurrentMod(self, profile:str, modId:str, platform:str, modVersionData:dict, progress=None) -> bool:
+        """install a mod version from the jar store, downloading it there first if needed, replacing the installed version only once the new file is ready,
+        can be used from any thread, the progress function is called with the bytes received and the total size"""
+        currentModPath = profilesDir/profile/platform.lower()/modId
+        sha1 = self.storeModVersion(modVersionData, progress)
+        if sha1 is None:
+            return False
+        wasInstalled = currentModPath.exists()
         currentModPath.mkdir(parents=True, exist_ok=True)
-        with open(currentModPath/"properties.json", "w", encoding="utf-8") as f:
-            json.dump(modVersionData, f, indent=4)
-        with open(currentModPath/modVersionData["fileName"], "wb") as f:
-            f.write(requests.get(modVersionData["downloadUrl"]).content)
+        previousFileName = json.load(open(currentModPath/"properties.json", "r", encoding="utf-8"))["fileName"] if wasInstalled else None
+        jarStore.Jars.link(sha1, currentModPath/modVersionData["fileName"])
+        if previousFileName and previousFileName != modVersionData["fileName"] and (currentModPath/previousFileName).exists():
+            os.remove(currentModPath/previousFileName)
+        modData = dict(modVersionData, hashes=dict(modVersionData.get("hashes") or {}, sha1=sha1))
+        atomicFiles.atomicWrite(currentModPath/"properties.json", json.dumps(modData, indent=4).encode("utf-8"))
+        profileManifest.Manifests.setMod(profile, modData)
         log.info(f"Installed mod '{modVersionData['modName']}' version '{modVersionData['versionName']}' in profile {profile}")
+        return True
+    
+    def storeModVersion(self, modVersionData:dict, progress=None) -> str:
+        """make sure the jar of a mod version is in the jar store, downloading and verifying it only if it isn't already there,
+        returns its sha1 or None if the download failed"""
+        sha1 = (modVersionData.get("hashes") or {}).get("sha1")
+        if jarStore.Jars.has(sha1):
+            log.debug(f"found '{modVersionData['fileName']}' in the jar store, no download needed")
+            return sha1.lower()
+        incomingPath = jarStore.Jars.incomingPath(modVersionData["fileName"])
+        try:
+            httpClient.Http.download(modVersionData["downloadUrl"], incomingPath, modVersionData.get("hashes"), progress)
+        except requests.exceptions.RequestException as e:
+            log.error(f"error while downloading mod '{modVersionData['modName']}' : {e}")
+            os.remove(incomingPath)
+            return None
+        return jarStore.Jars.add(incomingPath, sha1)
+    
+    def resolveDependencies(self, profile:str, modVersionData:dict) -> tuple:
+        """walk the required dependencies of a mod version, looking up every new dependency in parallel as soon as it's found,
+        and pick the newest version of each that works with the profile, can be used from any thread,
+        returns the versions to install (without the mod itself) and the names of the dependencies that couldn't be resolved"""
+        with open(profilesDir/profile/"properties.json", "r", encoding="utf-8") as f:
+            properties = json.load(f)
+        modloader = properties["modloader"].lower()
+        mcVersion = properties["version"]
+        platform = modVersionData["platform"]
+        seen = {str(modVersionData["modId"])}  # mods already resolved or being resolved
+        toInstall = []
+        missing = []
+        with ThreadPoolExecutor(max_workers=parallelPageRequests, thread_name_prefix="dependencies") as executor:
+            futures = set()
+            def submitDependencies(entry:dict):
+                for dependency in entry.get("dependencies", []):
+                    key = str(dependency["modId"] or dependency["versionId"])
+                    if key not in seen:
+                        seen.add(key)
+                        futures.add(executor.submit(self.resolveDependency, profile, platform, dependency, modloader, mcVersion))
+            submitDependencies(modVersionData)
+            while futures:
+                future = next(as_completed(futures))
+                futures.remove(future)
+                try:
+                    entry, name = future.result()
+                except Exception as e:
+                    log.error(f"error while resolving a dependency of mod '{modVersionData['modName']}' : {e}")
+                    continue
+                if entry is None:
+                    if name is not None:
+                        missing.append(name)
+                elif str(entry["modId"]) == str(modVersionData["modId"]) or any(str(entry["modId"]) == str(other["modId"]) for other in toInstall):
+                    continue  # only known by its version id before
+                else:
+                    seen.add(str(entry["modId"]))
+                    toInstall.append(entry)
+                    submitDependencies(entry)
+        log.info(f"resolved {len(toInstall)} dependencies to install for mod '{modVersionData['modName']}', {len(missing)} missing")
+        return toInstall, missing
+    
+    def resolveDependency(self, profile:str, platform:str, dependency:dict, modloader:str, mcVersion:str) -> tuple:
+        """find the version of a dependency to install in a profile,
+        returns the version entry and the mod name, with no entry if it's already installed or has no compatible version"""
+        modId = dependency["modId"]
+        if modId is None:  # modrinth dependencies can be given only by version
+            versionData = metadataStore.Metadata.getVersion(platform, dependency["versionId"]) or self.modrinthRequest(f"version/{dependency['versionId']}")
+            if versionData is None:
+                return None, dependency["versionId"]
+            modId = versionData["project_id"]
+        if (profilesDir/profile/platform/str(modId)).exists():
+            return None, None  # already installed, whatever its version
+        versions = self.getVersionsList(modId, platform, modloader, True, mcVersion)
+        if not versions:
+            modData = metadataStore.Metadata.getProject(platform, modId)
+            if modData is None:
+                return None, str(modId)
+            return None, modData["title"] if platform == "modrinth" else modData["data"]["name"]
+        entry = next((entry for entry in versions if entry["versionId"] == dependency["versionId"]), versions[0])
+        return entry, entry["modName"]
+    
+    def installModVersions(self, profile:str, modVersions:list, progress=None) -> int:
+        """download and install mod versions concurrently, can be used from any thread,
+        the progress function is called with the number of mods done and the total, returns the number of mods installed"""
+        installed = 0
+        with ThreadPoolExecutor(max_workers=parallelDownloads, thread_name_prefix="downloads") as executor:
+            futures = [executor.submit(self.installCurrentMod, profile, str(modVersionData["modId"]), modVersionData["platform"], modVersionData) for modVersionData in modVersions]
+            for done, future in enumerate(as_completed(futures), start=1):
+                try:
+                    if future.result():
+                        installed += 1
+                except Exception as e:
+                    log.error(f"error while installing a mod in profile {profile} : {e}")
+                if progress:
+                    progress(done, len(modVersions))
+        return installed
+    
+    def checkProfileUpdates(self, profile:str) -> list:
+        """look for newer compatible versions of all the mods of a profile in a few batched requests, can be used from any thread,
+        returns a list of (installed mod data, new version data), or None if a platform couldn't be checked"""
+        with open(profilesDir/profile/"properties.json", "r", encoding="utf-8") as f:
+            properties = json.load(f)
+        modloader = properties["modloader"].lower()
+        mcVersion = properties["version"]
+        installedMods = [mod for mod in self.getInstalledMods(profile) if not isinstance(mod, str)]
+        futures = [self.platformsExecutor.submit(self.checkModrinthUpdates, [mod for mod in installedMods if mod["platform"] == "modrinth"], profile, modloader, mcVersion),
+                   self.platformsExecutor.submit(self.checkCurseforgeUpdates, [mod for mod in installedMods if mod["platform"] == "curseforge"], modloader, mcVersion)]
+        updates = []
+        for future in futures:
+            platformUpdates = future.result()
+            if platformUpdates is None:
+                return None  # saying the mods are up to date would be wrong
+            updates.extend(platformUpdates)
+        log.info(f"found {len(updates)} updates for the {len(installedMods)} mods of profile {profile}")
+        return updates
+    
+    def checkModrinthUpdates(self, installedMods:list, profile:str, modloader:str, mcVersion:str) -> list:
+        """find the latest compatible versions of modrinth mods from the hashes of their files, with the bulk update endpoint,
+        returns None if a request failed"""
+        modsByHash = {}
+        for mod in installedMods:
+            sha1 = (mod.get("hashes") or {}).get("sha1")
+            if not sha1:  # installed before the hashes were saved
+                sha1 = jarStore.fileSha1(profilesDir/profile/"modrinth"/mod["modId"]/mod["fileName"])
+            modsByHash[sha1.lower()] = mod
+        hashes = list(modsByHash)
+        chunks = [hashes[index:index+modrinthVersionsBatchSize] for index in range(0, len(hashes), modrinthVersionsBatchSize)]
+        updates = []
+        for result in self.pagesExecutor.map(lambda chunk: self.modrinthPostRequest("version_files/update", {"hashes": chunk, "algorithm": "sha1", "loaders": [modloader], "game_versions": [mcVersion]}), chunks):
+            if result is None:
+                return None
+            for fileHash, versionData in result.items():
+                mod = modsByHash[fileHash.lower()]
+                if versionData["id"] != mod["versionId"]:
+                    metadataStore.Metadata.putVersions("modrinth", mod["modId"], {versionData["id"]: versionData})
+                    self.expireVersions("modrinth", mod["modId"])
+                    entry = self.modrinthVersionEntry(versionData, mod["modId"], mod["modName"], mod["iconUrl"])
+                    updates.append((mod, dict(entry, modloader=modloader)))
+        return updates
+    
+    def checkCurseforgeUpdates(self, installedMods:list, modloader:str, mcVersion:str) -> list:
+        """find the latest compatible files of curseforge mods, with one batch request for the mods and one for the new files,
+        returns None if a request failed"""
+        if not installedMods:
+            return []
+        modsById = {str(mod["modId"]): mod for mod in installedMods}
+        result = self.curseforgePostRequest("mods", {"modIds": [int(modId) for modId in modsById]})
+        if result is None:
+            return None
+        latestFiles = {}  # new file id -> installed mod data
+        for modData in result["data"]:
+            mod = modsById.get(str(modData["id"]))
+            if mod is None:
+                continue
+            compatibleIds = [fileIndex["fileId"] for fileIndex in modData["latestFilesIndexes"]
+                             if fileIndex["gameVersion"] == mcVersion and fileIndex.get("modLoader") == self.curseforgeModloaders[modloader]]
+            if compatibleIds and max(compatibleIds) > int(mod["versionId"]):  # newer files have bigger ids
+                latestFiles[max(compatibleIds)] = mod
+        if not latestFiles:
+            return []
+        result = self.curseforgePostRequest("mods/files", {"fileIds": list(latestFiles)})
+        if result is None:
+            return None
+        updates = []
+        for fileData in result["data"]:
+            mod = latestFiles.get(fileData["id"])
+            if mod is None or not fileData.get("downloadUrl"):
+                continue  # the author doesn't allow downloads from other apps
+            metadataStore.Metadata.putVersions("curseforge", mod["modId"], {str(fileData["id"]): {"data": fileData}})
+            self.expireVersions("curseforge", mod["modId"])
+            entry = self.curseforgeVersionEntry(fileData, mod["modId"], mod["modName"], mod["iconUrl"])
+            updates.append((mod, dict(entry, modloader=modloader)))
+        return updates
     
     def getInstalledMods(self, profile:str) -> list:
-        """get a list of the data of all the installed mods in a profile, sorted by name then the custom jar mods"""
+        """get a list of the data of all the installed mods in a profile from its manifest, sorted by name then the custom jar mods"""
         if profile is None:
             log.warning("No profile provided, cannot get installed mods")
             return []
-        currentProfileDir = profilesDir/profile
-        installedMods = []
-        if currentProfileDir.exists():
-            for platform in availablePlatforms:
-                if (currentProfileDir/platform).exists():
-                    for mod in glob.glob(str(currentProfileDir/platform/"*")):
-                        if os.path.isdir(mod):
-                            with open(Path(mod)/"properties.json", "r", encoding="utf-8") as f:
-                                installedMods.append(json.load(f))
-        else:
+        if not (profilesDir/profile).exists():
             log.error(f"Profile {profile} not found")
-        installedMods.sort(key=lambda mod: mod["modName"])
-        installedMods.extend([Path(file).name for file in glob.glob(str(currentProfileDir/"jar"/"*")) if os.path.isfile(Path(file))])
+            return []
+        manifest = profileManifest.Manifests.get(profile)
+        installedMods = sorted(manifest["mods"].values(), key=lambda mod: mod["modName"])
+        installedMods.extend(manifest["jars"])
         return installedMods
 
     def removeProfile(self, profile:str):
@@ -347,23 +1007,56 @@ class Methods():
             confirm = QMessageBox.question(None, lang("applyProfileTitle"), lang("applyProfileConfirm"), QMessageBox.Yes | QMessageBox.No)
             if confirm == QMessageBox.No:
                 return -1
-        for previousMod in glob.glob(str(minecraftModsPath/"*")):
-            if os.path.isfile(previousMod):
-                os.remove(previousMod)
-        for platform in availablePlatforms:
-            if (profilePath/platform).exists():
-                for mod in glob.glob(str(profilePath/platform/"*")):
-                    if os.path.isdir(mod):
-                        with open(Path(mod)/"properties.json", "r", encoding="utf-8") as f:
-                            modData = json.load(f)
-                        shutil.copyfile(Path(mod)/modData["fileName"], minecraftModsPath/modData["fileName"])
-        for jarMod in glob.glob(str(profilePath/"jar"/"*")):
-            if os.path.isfile(jarMod):
-                shutil.copyfile(jarMod, minecraftModsPath/Path(jarMod).name)
+        self.syncModsFolder(self.getProfileFiles(profile), minecraftModsPath)
         log.info(f"Applied profile {profile}")
         if not auto:
             QMessageBox.information(None, lang("success"), lang("profileApplied"))
     
+    def getProfileFiles(self, profile:str) -> dict:
+        """get the jar files of a profile as a dictionary with the file names as keys, and their path and sha1 (None if unknown)"""
+        profilePath = profilesDir/profile
+        manifest = profileManifest.Manifests.get(profile)
+        profileFiles = {}
+        for modData in manifest["mods"].values():
+            profileFiles[modData["fileName"]] = {"path": profilePath/modData["platform"].lower()/str(modData["modId"])/modData["fileName"], "sha1": (modData.get("hashes") or {}).get("sha1")}
+        for jarMod in manifest["jars"]:
+            profileFiles[jarMod] = {"path": profilePath/"jar"/jarMod, "sha1": None}
+        return profileFiles
+    
+    def syncModsFolder(self, profileFiles:dict, modsFolder:Path):
+        """make a mods folder match the files of a profile, only removing the files that aren't in the profile or differ by size or hash,
+        and only adding the missing ones, as hardlinks or reflinks when possible"""
+        removed = 0
+        kept = set()
+        for entry in os.scandir(modsFolder):
+            if not entry.is_file():
+                continue
+            profileFile = profileFiles.get(entry.name)
+            if profileFile is not None and self.isSameFile(Path(entry.path), profileFile):
+                kept.add(entry.name)
+            else:
+                os.remove(entry.path)
+                removed += 1
+        added = 0
+        for fileName, profileFile in profileFiles.items():
+            if fileName not in kept:
+                jarStore.linkOrCopy(profileFile["path"], modsFolder/fileName)
+                added += 1
+        log.info(f"synced mods folder: kept {len(kept)} files, removed {removed}, added {added}")
+    
+    def isSameFile(self, path:Path, profileFile:dict) -> bool:
+        """check if a file in the mods folder is the same as a file of the profile, by link, then size, then hash"""
+        try:
+            if os.path.samefile(path, profileFile["path"]):
+                return True  # hardlinked from the profile
+            if path.stat().st_size != profileFile["path"].stat().st_size:
+                return False
+        except OSError:
+            return False
+        if profileFile["sha1"] is None:
+            profileFile["sha1"] = jarStore.fileSha1(profileFile["path"])
+        return jarStore.fileSha1(path) == profileFile["sha1"].lower()
+    
     def installJarMod(self, profile:str, modPath:Path):
         """install a jar mod to the profile"""
         jarFolder = profilesDir/profile/"jar"
@@ -385,6 +1078,7 @@ class Methods():
                 log.info(f"Cancelled installation of jar mod {filename} in profile {profile}")
                 return -1
         shutil.copyfile(modPath, jarFolder/filename)
+        profileManifest.Manifests.addJar(profile, filename)
         log.info(f"Installed jar mod {filename} in profile {profile}")
     
     def renameProfile(self, currentName:str, newName:str):
@@ -433,7 +1127,9 @@ class Methods():
         }  #TODO: implement login
         
         log.info("saving previous mods")
-        self.savePreviousMods()
+        if not self.savePreviousMods():
+            QMessageBox.warning(None, lang("error"), lang("modsRestoreFailed") if modsSwapMarker.exists() else lang("modsSaveFailed"))
+            return
         log.info(f"applying profile {profile}")
         self.applyProfile(profile, auto=True)
         log.info(f"Launching game in offline mode with profile {profile}")
@@ -444,6 +1140,8 @@ class Methods():
         self.runningPopup.exec_()
         while self.gameRunning:
             self.runningPopup.exec_()
+        if not self.modsRestored:
+            QMessageBox.warning(None, lang("error"), lang("modsRestoreFailed"))
     
     def openGame(self, version, options):
         """open the minecraft game once everything is set up"""
@@ -453,41 +1151,70 @@ class Methods():
             log.error(f"Error while launching game : {e}")
             error_message = f"Error while launching game: {e}\n\n{traceback.format_exc()}"
             QMessageBox.critical(None, lang("error"), error_message)
-        self.restorePreviousMods()
+        self.modsRestored = self.restorePreviousMods()
         self.gameRunning = False
-        log.info("game closed, restored previous mods")
+        log.info("game closed")
     
     def savePreviousMods(self):
-        """save the previous mods to restore them after the game is closed"""
-        modsStorage = cacheDir/"previousMods"
-        modsStorage.mkdir(parents=True, exist_ok=True)
-        for mod in glob.glob(str(minecraftModsPath/"*")):
-            if os.path.isfile(mod):
-                shutil.copyfile(mod, modsStorage/Path(mod).name)
-                os.remove(mod)
-        
+        """put the current mods folder aside by renaming it, and bring back the mods folder of the last launched profile so only the differences are applied,
+        a marker is kept until the mods are restored so it can be done at the next start if the app stops before,
+        returns False if previous mods were already saved and couldn't be restored, or if the mods folder couldn't be put aside,
+        the marker is then only kept in the first case"""
+        if modsSwapMarker.exists():
+            log.warning("previous mods are already saved, restoring them first")
+            if not self.restorePreviousMods():
+                return False
+        atomicFiles.atomicWrite(modsSwapMarker, json.dumps({"modsPath": str(minecraftModsPath), "previousModsPath": str(previousModsPath)}, indent=4).encode("utf-8"))
+        if not self.renameWithRetries(minecraftModsPath, previousModsPath):
+            log.error("unable to put the mods folder aside, the game won't be launched")
+            os.remove(modsSwapMarker)
+            return False
+        try:
+            if appliedModsPath.exists():
+                os.rename(appliedModsPath, minecraftModsPath)
+            else:
+                minecraftModsPath.mkdir()
+        except OSError as e:
+            log.error(f"unable to bring back the mods of the last launched profile, putting the mods folder back : {e}")
+            try:
+                os.rename(previousModsPath, minecraftModsPath)
+                os.remove(modsSwapMarker)
+            except OSError as e:  # the marker is kept so it's restored at the next start
+                log.error(f"unable to put the mods folder back : {e}")
+            return False
+        return True
 
-    def restorePreviousMods(self):
-        """restore the previous mods after the game is closed"""
-        modsStorage = cacheDir/"previousMods"
-        if modsStorage.exists():
-            # delete the current mods
-            while True:
-                try:
-                    for currentMod in glob.glob(str(minecraftModsPath/"*")):
-                        if os.path.isfile(currentMod):
-                            os.remove(currentMod)
-                    break
-                except PermissionError:
-                    log.warning("Permission error while deleting current mods, retrying")
-                    time.sleep(0.1)
-            # restore the previous mods
-            for mod in glob.glob(str(modsStorage/"*")):
-                if os.path.isfile(mod):
-                    shutil.copyfile(mod, minecraftModsPath/Path(mod).name)
-            shutil.rmtree(modsStorage)
-        else:
+    def renameWithRetries(self, source:Path, destination:Path) -> bool:
+        """rename a folder, retrying for a few seconds while its files are locked, returns whether it worked"""
+        for attempt in range(50):
+            try:
+                os.rename(source, destination)
+                return True
+            except PermissionError:  # the game or another program can still hold the files for a moment
+                log.warning(f"Permission error while renaming {source}, retrying")
+                time.sleep(0.1)
+            except OSError as e:
+                log.error(f"unable to rename {source} to {destination} : {e}")
+                return False
+        return False
+
+    def restorePreviousMods(self) -> bool:
+        """restore the previous mods after the game is closed, keeping the mods folder of the profile for the next launch,
+        returns False if the profile mods are still locked, the marker is then kept to try again at the next start"""
+        if not previousModsPath.exists():
             log.error("No previous mods found to restore")
+            if modsSwapMarker.exists():
+                os.remove(modsSwapMarker)
+            return True
+        if appliedModsPath.exists():
+            shutil.rmtree(appliedModsPath)
+        if minecraftModsPath.exists() and not self.renameWithRetries(minecraftModsPath, appliedModsPath):  # deleting them would fail on the same locked files
+            log.error(f"unable to put the profile mods aside, the previous mods stay in {previousModsPath} until the next start")
+            return False
+        os.rename(previousModsPath, minecraftModsPath)
+        os.remove(modsSwapMarker)
+        log.info("restored previous mods")
+        return True
 
     def getBestLoaderVersion(self, modloader:str, mcVersion:str) -> str:
         """get the latest version of a modloader for a minecraft version from the installed versions"""
@@ -1,12 +1,16 @@
-import backendMethods
+import backendMethods, thumbnailStore, profileManifest  # local modules
 from usefulVariables import *  # local variables
 import PyQt5.QtWidgets as Qt
 from PyQt5 import QtGui, QtCore
 from PyQt5.QtWidgets import QMessageBox
+from collections import Counter
 from pathlib import Path
+import logging
 import json
 import glob
 
+log = logging.getLogger(__name__)
+
 
 class SeparationLine(Qt.QFrame):
     def __init__(self):
@@ -90,244 +94,230 @@ class ProfileSelect(Qt.QFrame):
             self.setFrameShape(Qt.QFrame.NoFrame)
             self.isSelected = False
 
-class ModSelect(Qt.QFrame):
-    wasSelected = QtCore.pyqtSignal(object)
-    def __init__(self, modData:dict):
-        """a button to select the mod to view or modify"""
+class ModListModel(QtCore.QAbstractListModel):
+    SubtitleRole = QtCore.Qt.UserRole + 1  # second line of text under the mod name
+    ModDataRole = QtCore.Qt.UserRole + 2  # data of the mod given to the list
+    def __init__(self, iconDownloader:"backendMethods.IconDownloader"=None):
+        """a list of mods from a search or installed in a profile, keeping only their data so the view paints the visible ones,
+        the icons are requested only when their row is painted"""
         super().__init__()
-        self.mainLayout = Qt.QHBoxLayout()
-        self.mainLayout.setAlignment(QtCore.Qt.AlignCenter)
-        self.setLayout(self.mainLayout)
-        self.isSelected = False
-
-        if isinstance(modData, str):  # if it's a custom jar mod
-            self.isCustom = True
-            self.fileName = modData
+        self.iconDownloader = iconDownloader
+        self.mods = []  # (name, subtitle, platform, mod id, icon url, data of the mod)
+        self.rowsByKey = {}  # (platform, mod id) -> rows showing this mod
+        self.requestedIcons = set()  # icons already asked to the downloader, so a missing one isn't requested at every paint, until the mods change
+
+    def describe(self, modData:object) -> tuple:
+        """get what the list shows of a search result, an installed mod or a custom jar name"""
+        if isinstance(modData, str):  # custom jar mod
+            return (modData, "", None, None, None, modData)
+        if "modName" in modData:  # installed mod
+            return (modData["modName"], modData["versionName"] or "", modData["platform"].lower(), str(modData["modId"]), modData["iconUrl"], modData)
+        platform = modData["platform"].lower()
+        if platform == "modrinth":
+            iconUrl = modData["rawData"]["icon_url"]
+        elif platform == "curseforge":
+            iconUrl = (modData["rawData"].get("logo") or {}).get("thumbnailUrl")
         else:
-            self.isCustom = False
-            self.modData = modData
-            self.name = modData["modName"]
-            self.modId = modData["modId"]
-            self.fileName = modData["fileName"]
-            self.version = modData["versionName"]
-            self.iconPath = cacheDir/"modIcons"/modData["platform"].lower()/f"{self.modId}.png"
-            self.versionId = modData["versionId"]
-
-        # mod icon
-        self.iconLabel = Qt.QLabel()
-        self.updateIcon()
-        self.mainLayout.addWidget(self.iconLabel)
-
-        self.textWidget = Qt.QWidget()
-        self.textLayout = Qt.QVBoxLayout()
-        self.textWidget.setLayout(self.textLayout)
-        self.mainLayout.addWidget(self.textWidget, 1)
-
-        self.nameLabel = Qt.QLabel(self.name if not self.isCustom else self.fileName)
-        self.nameLabel.setFont(Fonts.smallTitleFont)
-        self.nameLabel.setWordWrap(True)
-        self.textLayout.addWidget(self.nameLabel)
-
-        self.versionLabel = Qt.QLabel()
-        if not self.isCustom:
-            if self.version:
-                self.versionLabel.setText(self.version)
-                self.versionLabel.setFont(Fonts.textFont)
-                self.versionLabel.setWordWrap(True)
-                self.textLayout.addWidget(self.versionLabel)
-
-        # mouse tracking
-        self.setMouseTracking(True)
-        self.enterEvent = self.onEnter
-        self.leaveEvent = self.onLeave
-
-        self.mousePressEvent = self.onMousePress
-    
-    def updateIcon(self):
-        """update the icon from the iconPath if it exists"""
-        if self.isCustom:
-            self.iconLabel.setPixmap(QtGui.QPixmap(str(iconsAssetsDir/"jar.png")).scaled(64, 64))
-        else:
-            if os.path.exists(self.iconPath):
-                self.iconLabel.setPixmap(QtGui.QPixmap(str(self.iconPath)).scaled(64, 64))
-            else:
-                self.iconLabel.setPixmap(QtGui.QPixmap(str(iconsAssetsDir/"noMedia.png")).scaled(64, 64))
-
-    def onMousePress(self, event):
-        if not self.isSelected:
-            self.setSelected(True)
-        event.accept()
-
-    def onEnter(self, event):
-        self.setHovered(True)
-        event.accept()
-
-    def onLeave(self, event):
-        self.setHovered(False)
-        event.accept()
-    
-    def setHovered(self, hovered:bool):
-        """gray out the frame on hover"""
-        if hovered:
-            self.setStyleSheet("background-color: rgba(0, 0, 0, 64);")
-            for widget in (self.textWidget, self.nameLabel, self.versionLabel, self.iconLabel):  # avoid applying shadow to inner widgets
-                widget.setStyleSheet("background-color: rgba(0, 0, 0, 0)")
-        else:
-            self.setStyleSheet("")
-
-    def setSelected(self, selected:bool):
-        """outline the frame if selected"""
-        if selected:
-            if not self.isCustom:
-                self.setFrameShape(Qt.QFrame.Box)
-                self.isSelected = True
-                self.wasSelected.emit(self.modData)
-            else:
-                self.wasSelected.emit(self.fileName)
-                
-        else:
-            self.setFrameShape(Qt.QFrame.NoFrame)
-            self.isSelected = False
+            iconUrl = None
+            log.error(f"unknown platform: {platform}")
+        return (modData["name"], f"by {modData['author']}" if modData["author"] else "", platform, str(modData["id"]), iconUrl, modData)
+
+    def setMods(self, mods:list):
+        """replace all the mods of the list"""
+        self.beginResetModel()
+        self.requestedIcons.clear()  # icons whose download failed are asked again for the new list
+        self.mods = [self.describe(modData) for modData in mods]
+        self.rowsByKey = {}
+        for row, mod in enumerate(self.mods):
+            self.rowsByKey.setdefault((mod[2], mod[3]), []).append(row)
+        self.endResetModel()
+
+    def appendMods(self, mods:list):
+        """add mods at the end of the list"""
+        if not mods:
+            return
+        first = len(self.mods)
+        self.beginInsertRows(QtCore.QModelIndex(), first, first+len(mods)-1)
+        for row, modData in enumerate(mods, start=first):
+            mod = self.describe(modData)
+            self.mods.append(mod)
+            self.rowsByKey.setdefault((mod[2], mod[3]), []).append(row)
+        self.endInsertRows()
+
+    def clear(self):
+        """remove all the mods of the list"""
+        self.setMods([])
+
+    def rowCount(self, parent:QtCore.QModelIndex=QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.mods)
+
+    def data(self, index:QtCore.QModelIndex, role:int=QtCore.Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.mods):
+            return None
+        name, subtitle, platform, modId, iconUrl, modData = self.mods[index.row()]
+        if role == QtCore.Qt.DisplayRole:
+            return name
+        if role == self.SubtitleRole:
+            return subtitle
+        if role == self.ModDataRole:
+            return modData
+        if role == QtCore.Qt.DecorationRole:
+            if platform is None:
+                return thumbnailStore.Thumbnails.assetPixmap("jar.png", 64)
+            pixmap = thumbnailStore.Thumbnails.pixmap(platform, modId, 64)
+            if pixmap is not None:
+                return pixmap
+            if self.iconDownloader and (platform, modId) not in self.requestedIcons:
+                self.requestedIcons.add((platform, modId))
+                self.iconDownloader.request(platform, modId, iconUrl, lambda: self.iconChanged(platform, modId))
+            return thumbnailStore.Thumbnails.assetPixmap("noMedia.png", 64)
+        return None
 
-class SearchModSelect(Qt.QFrame):
-    wasSelected = QtCore.pyqtSignal(dict)
-    def __init__(self, modData:dict):
-        """a button to select the mod to view and install"""
+    def iconChanged(self, platform:str, modId:str):
+        """repaint the rows of a mod once its icon was downloaded"""
+        for row in self.rowsByKey.get((platform, modId), []):
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [QtCore.Qt.DecorationRole])
+
+class ModDelegate(Qt.QStyledItemDelegate):
+    iconSize = 64
+    margin = 10
+    def __init__(self, parent:Qt.QWidget=None):
+        """paints a mod of a list with its icon, name and subtitle, grayed out on hover and outlined when selected"""
+        super().__init__(parent)
+        self.nameMetrics = QtGui.QFontMetrics(Fonts.smallTitleFont)
+        self.subtitleMetrics = QtGui.QFontMetrics(Fonts.textFont)
+
+    def sizeHint(self, option:Qt.QStyleOptionViewItem, index:QtCore.QModelIndex) -> QtCore.QSize:
+        return QtCore.QSize(option.rect.width(), self.iconSize + 2*self.margin)
+
+    def paint(self, painter:QtGui.QPainter, option:Qt.QStyleOptionViewItem, index:QtCore.QModelIndex):
+        painter.save()
+        rect = option.rect
+        if option.state & Qt.QStyle.State_MouseOver:
+            painter.fillRect(rect, QtGui.QColor(0, 0, 0, 64))
+        if option.state & Qt.QStyle.State_Selected:
+            painter.setPen(option.palette.color(QtGui.QPalette.WindowText))
+            painter.drawRect(rect.adjusted(0, 0, -1, -1))
+        pixmap = index.data(QtCore.Qt.DecorationRole)
+        if pixmap is not None:
+            painter.drawPixmap(rect.left()+self.margin, rect.top()+self.margin, self.iconSize, self.iconSize, pixmap)
+        textLeft = rect.left() + self.iconSize + 2*self.margin
+        textWidth = rect.right() - textLeft - self.margin
+        painter.setPen(option.palette.color(QtGui.QPalette.Text))
+        subtitle = index.data(ModListModel.SubtitleRole)
+        nameTop = rect.top() + self.margin if subtitle else rect.top() + (rect.height() - self.nameMetrics.height())//2
+        painter.setFont(Fonts.smallTitleFont)
+        painter.drawText(QtCore.QRect(textLeft, nameTop, textWidth, self.nameMetrics.height()), QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter,
+                         self.nameMetrics.elidedText(index.data(QtCore.Qt.DisplayRole), QtCore.Qt.ElideRight, textWidth))
+        if subtitle:
+            painter.setFont(Fonts.textFont)
+            painter.drawText(QtCore.QRect(textLeft, nameTop + self.nameMetrics.height() + 4, textWidth, self.subtitleMetrics.height()), QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter,
+                             self.subtitleMetrics.elidedText(subtitle, QtCore.Qt.ElideRight, textWidth))
+        painter.restore()
+
+class ModListView(Qt.QListView):
+    wasSelected = QtCore.pyqtSignal(object)
+    wasHovered = QtCore.pyqtSignal(object)  # data of the mod under the mouse
+    def __init__(self, iconDownloader:"backendMethods.IconDownloader"=None):
+        """a list of mods where only the visible rows are painted, whatever the number of mods"""
         super().__init__()
-        self.mainLayout = Qt.QHBoxLayout()
-        self.mainLayout.setAlignment(QtCore.Qt.AlignLeft)
-        self.setLayout(self.mainLayout)
-
-        self.modData = modData
-        self.name = modData["name"]
-        self.author = modData["author"]
-        self.iconPath = modData["icon"]
-        self.modId = modData["id"]
-        self.platform = modData["platform"]
-        self.isSelected = False
-
-        # mod icon
-        self.iconLabel = Qt.QLabel()
-        self.updateIcon()
-        self.mainLayout.addWidget(self.iconLabel)
-
-        # widget containing the informations about the mod
-        self.textWidget = Qt.QWidget()
-        self.textLayout = Qt.QVBoxLayout()
-        self.textWidget.setLayout(self.textLayout)
-        self.mainLayout.addWidget(self.textWidget, 1)  # the 1 makes the widget expandable
-
-        self.nameLabel = Qt.QLabel(self.name)
-        self.nameLabel.setFont(Fonts.smallTitleFont)
-        self.nameLabel.setWordWrap(True)
-        self.textLayout.addWidget(self.nameLabel)
-
-        self.authorLabel = Qt.QLabel(f"by {self.author}")
-        self.authorLabel.setFont(Fonts.textFont)
-        self.authorLabel.setWordWrap(True)
-        self.textLayout.addWidget(self.authorLabel)
-
-        # mouse tracking
+        self.modsModel = ModListModel(iconDownloader)
+        self.setModel(self.modsModel)
+        self.setItemDelegate(ModDelegate(self))
+        self.setUniformItemSizes(True)  # rows are laid out without measuring each of them
+        self.setVerticalScrollMode(Qt.QAbstractItemView.ScrollPerPixel)
+        self.setSelectionMode(Qt.QAbstractItemView.SingleSelection)
+        self.setFrameShape(Qt.QFrame.NoFrame)
         self.setMouseTracking(True)
-        self.enterEvent = self.onEnter
-        self.leaveEvent = self.onLeave
-
-        self.mousePressEvent = self.onMousePress
-    
-    def updateIcon(self):
-        """update the icon from the iconPath if it exists"""
-        if os.path.exists(self.iconPath):
-            self.iconLabel.setPixmap(QtGui.QPixmap(str(self.iconPath)).scaled(64, 64))
-        else:
-            self.iconLabel.setPixmap(QtGui.QPixmap(str(iconsAssetsDir/"noMedia.png")).scaled(64, 64))
-
-    def onMousePress(self, event):
-        if not self.isSelected:
-            self.setSelected(True)
-        event.accept()
-
-    def onEnter(self, event):
-        self.setHovered(True)
-        event.accept()
-
-    def onLeave(self, event):
-        self.setHovered(False)
-        event.accept()
-    
-    def setHovered(self, hovered:bool):
-        """gray out the frame on hover"""
-        if hovered:
-            self.setStyleSheet("background-color: rgba(0, 0, 0, 64);")
-            for widget in (self.textWidget, self.nameLabel, self.iconLabel):  # avoid applying shadow to inner widgets
-                widget.setStyleSheet("background-color: rgba(0, 0, 0, 0)")
-        else:
-            self.setStyleSheet("")
+        self.viewport().setAttribute(QtCore.Qt.WA_Hover)
+        self.setStyleSheet("QListView { background: transparent; }")
+        self.clicked.connect(self.onClicked)
+        self.entered.connect(lambda index: self.wasHovered.emit(index.data(ModListModel.ModDataRole)))
 
-    def setSelected(self, selected:bool):
-        """outline the frame if selected"""
-        if selected:
-            self.setFrameShape(Qt.QFrame.Box)
-            self.isSelected = True
-            self.wasSelected.emit(self.modData)
-        else:
-            self.setFrameShape(Qt.QFrame.NoFrame)
-            self.isSelected = False
+    def onClicked(self, index:QtCore.QModelIndex):
+        modData = index.data(ModListModel.ModDataRole)
+        if isinstance(modData, str):  # custom jar mods open a popup instead of being selected
+            self.clearSelection()
+        self.wasSelected.emit(modData)
 
 class ModVersionRadio(Qt.QWidget):
-    def __init__(self):
-        """a serie of radio buttons to select the mod version, given a list of versions with their properties"""
+    def __init__(self, scrollArea:Qt.QScrollArea=None):
+        """radio buttons to select the mod version, given the versions with their properties,
+        only the first page of buttons is created and the next ones are added when the scroll area gets near the end"""
         super().__init__()
-        self.versions = {}
-        self.radioButtons = []
+        self.versions = []  # version entries from the newest
+        self.versionsById = {}
+        self.labels = {}  # version id -> prefix of its button text
+        self.selectedVersionId = None
+        self.radioButtons = []  # created buttons, reused when the versions change
+        self.shownCount = 0
         self.mainLayout = Qt.QVBoxLayout()
         self.setLayout(self.mainLayout)
         self.radioGroup = Qt.QButtonGroup(self)
+        self.radioGroup.buttonClicked[int].connect(self.onButtonClicked)
+        self.scrollBar = scrollArea.verticalScrollBar() if scrollArea else None
+        if self.scrollBar:
+            self.scrollBar.valueChanged.connect(self.loadMoreIfNeeded)
+            self.scrollBar.rangeChanged.connect(lambda minimum, maximum: self.loadMoreIfNeeded())
     
     def setVersions(self, versions:dict, gameVersion:str):
-        """update the radio buttons with the new versions"""
-        self.versions = versions
-        # clear previous radio buttons
-        for radioButton in self.radioButtons:
-            self.radioGroup.removeButton(radioButton)
-        self.radioButtons = []
-        for i in reversed(range(self.mainLayout.count())):
-            self.mainLayout.itemAt(i).widget().deleteLater()
-        
-        # create new radio buttons
-        foundRecommended = False
-        isFirst = True
-        for version, properties in self.versions.items():
-            text = f"{properties['releaseType']} - {version}"
-            if isFirst:
-                text = f"(latest) {text}"
-            if not foundRecommended and properties['releaseType'] == "release" and gameVersion in properties['mcVersions']:
-                text = f"(recommended) {text}"
-                foundRecommended = True
-            radioButton = Qt.QRadioButton(text)
-            radioButton.setFont(Fonts.subtitleFont)
-            self.radioGroup.addButton(radioButton)
-            self.radioButtons.append(radioButton)
-            self.mainLayout.addWidget(radioButton)
-            isFirst = False
-        
-    def getSelectionData(self) -> dict:
-        """return the version data of the selected radio button"""
-        for radioButton in self.radioButtons:
-            if radioButton.isChecked():
-                version = radioButton.text()
-                cleanVersion = version
-                for prefix in ["(latest) ", "(recommended) ", "release - ", "beta - ", "alpha - "]:
-                    cleanVersion = cleanVersion.replace(prefix, "", 1)  # remove the prefix
-                return self.versions[cleanVersion]
-        return None  # if no version selected
+        """show the new versions, keeping the selected one if it's still there"""
+        self.versions = list(versions.values())
+        self.versionsById = {str(properties["versionId"]): properties for properties in self.versions}
+        if self.selectedVersionId not in self.versionsById:
+            self.selectedVersionId = None
+        self.labels = {}
+        namesCount = Counter(properties["versionName"] for properties in self.versions)
+        self.sharedNames = {name for name, count in namesCount.items() if count > 1}  # told apart by their minecraft versions
+        if self.versions:
+            self.labels[str(self.versions[0]["versionId"])] = "(latest) "
+        recommended = next((properties for properties in self.versions if properties["releaseType"] == "release" and gameVersion in properties["mcVersions"]), None)
+        if recommended is not None:
+            versionId = str(recommended["versionId"])
+            self.labels[versionId] = "(recommended) " + self.labels.get(versionId, "")
+        for radioButton in self.radioButtons[:self.shownCount]:
+            radioButton.hide()
+        self.shownCount = 0
+        if self.scrollBar:
+            self.scrollBar.setValue(0)  # start again from the first page
+        self.showMore(versionsPageSize)
     
-    def getCheckedVersion(self):
-        """return the version data of the checked radio button"""
-        for radioButton in self.radioGroup.buttons():
-            if radioButton.isChecked():
-                version = radioButton.text()
-                return version, self.versions[version]
-        return None
+    def showMore(self, count:int):
+        """show the buttons of the next versions, creating them only if there aren't enough already"""
+        end = min(self.shownCount + count, len(self.versions))
+        for index in range(self.shownCount, end):
+            if index == len(self.radioButtons):
+                radioButton = Qt.QRadioButton()
+                radioButton.setFont(Fonts.subtitleFont)
+                self.radioGroup.addButton(radioButton, index)
+                self.radioButtons.append(radioButton)
+                self.mainLayout.addWidget(radioButton)
+            radioButton = self.radioButtons[index]
+            properties = self.versions[index]
+            versionId = str(properties["versionId"])
+            text = f"{self.labels.get(versionId, '')}{properties['releaseType']} - {properties['versionName']}"
+            if properties["versionName"] in self.sharedNames:
+                text += f" ({', '.join(properties['mcVersions'])})"
+            radioButton.setText(text)
+            self.radioGroup.setExclusive(False)  # an exclusive group doesn't allow unchecking
+            radioButton.setChecked(versionId == self.selectedVersionId)
+            self.radioGroup.setExclusive(True)
+            radioButton.show()
+        self.shownCount = end
+    
+    def loadMoreIfNeeded(self):
+        """add a page of buttons when the list is scrolled near its end, or doesn't fill the scroll area yet"""
+        if self.shownCount < len(self.versions) and self.scrollBar.value() >= self.scrollBar.maximum() - self.scrollBar.pageStep()//2:
+            self.showMore(versionsPageSize)
+    
+    def onButtonClicked(self, index:int):
+        """remember the selected version by its id"""
+        self.selectedVersionId = str(self.versions[index]["versionId"])
+    
+    def getSelectionData(self) -> dict:
+        """return the version data of the selected version"""
+        return self.versionsById.get(self.selectedVersionId)  # None if no version selected
 
 
 class addProfilePopup(Qt.QDialog):
@@ -499,6 +489,7 @@ class CustomModMenu(Qt.QWidget):
         confirm = QMessageBox.question(self, lang("removeMod"), lang("removeModConfirm"), QMessageBox.Yes | QMessageBox.No)
         if confirm == QMessageBox.Yes:
             os.remove(self.modFilePath)
+            profileManifest.Manifests.removeJar(self.modFilePath.parent.parent.name, self.modFilePath.name)
             QMessageBox.information(self, lang("success"), lang("modRemoved"))
             self.needRefresh.emit()
             self.close()
@@ -516,6 +507,7 @@ class CustomModMenu(Qt.QWidget):
                 QMessageBox.warning(self, lang("error"), lang("modNameExistsError"))
                 return
             os.rename(self.modFilePath, newFilePath)
+            profileManifest.Manifests.renameJar(self.modFilePath.parent.parent.name, self.modFilePath.name, newFilePath.name)
             QMessageBox.information(self, lang("success"), lang("modRenamed"))
             self.needRefresh.emit()
             self.close()
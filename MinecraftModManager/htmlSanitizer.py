@@ -0,0 +1,56 @@
+from html.parser import HTMLParser
+from html import escape
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class DescriptionSanitizer(HTMLParser):
+    removedContentTags = {"script", "style", "iframe", "object", "embed", "noscript", "template"}  # removed with everything inside
+    removedTags = {"img", "video", "audio", "source", "picture", "link", "meta", "base", "form", "input", "button"}  # removed, their content is kept
+    voidTags = {"br", "hr", "col", "wbr", "area", "track"}  # tags without a closing tag
+    keptAttributes = {"align", "width", "height", "colspan", "rowspan", "style", "class", "title"}
+
+    def __init__(self):
+        """rewrites the html of a mod description in a single pass: links become their text, images and scripts are removed"""
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skipDepth = 0  # depth inside tags removed with their content
+
+    def handle_starttag(self, tag:str, attrs:list):
+        if tag in self.removedContentTags:
+            self.skipDepth += 1
+            return
+        if self.skipDepth or tag == "a" or tag in self.removedTags:
+            return
+        attributes = "".join(f' {name}="{escape(value or "", quote=True)}"' for name, value in attrs if name in self.keptAttributes)
+        self.parts.append(f"<{tag}{attributes}>")
+
+    def handle_startendtag(self, tag:str, attrs:list):
+        self.handle_starttag(tag, attrs)
+        if tag in self.removedContentTags:
+            self.skipDepth -= 1
+
+    def handle_endtag(self, tag:str):
+        if tag in self.removedContentTags:
+            self.skipDepth = max(self.skipDepth - 1, 0)
+            return
+        if self.skipDepth or tag == "a" or tag in self.removedTags or tag in self.voidTags:
+            return
+        self.parts.append(f"</{tag}>")
+
+    def handle_data(self, data:str):
+        if not self.skipDepth:
+            self.parts.append(escape(data, quote=False))
+
+    def result(self) -> str:
+        """get the sanitized html"""
+        self.close()
+        return "".join(self.parts)
+
+
+def sanitizeHtml(html:str) -> str:
+    """clean an html string from all the links and images, replacing them with a textual version"""
+    sanitizer = DescriptionSanitizer()
+    sanitizer.feed(html)
+    return sanitizer.result()
@@ -0,0 +1,61 @@
+import atomicFiles  # local modules
+from usefulVariables import *  # local variables
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from pathlib import Path
+import requests
+import hashlib
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class HashMismatchError(requests.exceptions.RequestException):
+    """the downloaded file doesn't match the hash given by the platform, handled like any failed download"""
+
+
+class HttpClient():
+    def __init__(self, connectTimeout:float=httpConnectTimeout, readTimeout:float=httpReadTimeout, retries:int=httpRetries, poolSize:int=httpPoolSize):
+        """an http client keeping a pool of alive connections per host, with timeouts and retries with exponential backoff"""
+        self.timeout = (connectTimeout, readTimeout)
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                      backoff_factor=httpBackoffFactor,
+                      status_forcelist=(500, 502, 503, 504),
+                      allowed_methods=frozenset(["GET", "HEAD", "POST"]),  # every request of the app is a read-only query
+                      raise_on_status=False)  # give back the last response so raise_for_status can handle it
+        adapter = HTTPAdapter(pool_connections=len(availablePlatforms)+2, pool_maxsize=poolSize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = f"IGaming73/MinecraftModManager/{appVersion}"
+
+    def get(self, url:str, params:dict=None, stream:bool=False, **kwargs) -> requests.Response:
+        """make a get request reusing the pooled connections"""
+        return self.session.get(url, params=params, stream=stream, timeout=kwargs.pop("timeout", self.timeout), **kwargs)
+
+    def post(self, url:str, json:object=None, **kwargs) -> requests.Response:
+        """make a post request with a json body reusing the pooled connections"""
+        return self.session.post(url, json=json, timeout=kwargs.pop("timeout", self.timeout), **kwargs)
+
+    def download(self, url:str, path:Path, hashes:dict=None, progress=None, chunkSize:int=downloadChunkSize):
+        """stream a file in chunks to a temporary file, check it against the strongest of the given hashes, then rename it to its path,
+        the progress function is called with the bytes received and the total size (0 if unknown)"""
+        algorithm = next((algorithm for algorithm in ("sha512", "sha1", "md5") if hashes and hashes.get(algorithm)), None)
+        hasher = hashlib.new(algorithm) if algorithm else None
+        with atomicFiles.atomicPath(path) as tempPath:  # the file only appears once complete and verified
+            with open(tempPath, "wb") as f, self.get(url, stream=True) as response:
+                response.raise_for_status()
+                totalSize = int(response.headers.get("Content-Length", 0))
+                receivedSize = 0
+                for chunk in response.iter_content(chunk_size=chunkSize):
+                    f.write(chunk)
+                    if hasher:
+                        hasher.update(chunk)
+                    receivedSize += len(chunk)
+                    if progress:
+                        progress(receivedSize, totalSize)
+            if hasher and hasher.hexdigest() != hashes[algorithm].lower():
+                raise HashMismatchError(f"{algorithm} of the file downloaded from {url} doesn't match the expected one")
+
+
+Http = HttpClient()  # the client shared by the whole app
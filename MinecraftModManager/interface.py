@@ -1,11 +1,10 @@
-import customWidgets, backendMethods  # local modules
+import customWidgets, backendMethods, thumbnailStore, profileModel  # local modules
 from usefulVariables import *  # local variables
 import PyQt5.QtWidgets as Qt
 from PyQt5 import QtCore, QtGui
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import threading
 import logging
-import markdown
 import ctypes
 import os
 
@@ -17,23 +16,43 @@ if os.name == "nt":  # if on Windows
 
 Methods = backendMethods.Methods()
 StartCode = backendMethods.Start()
-StartCode.start()  # setup the software
+StartCode.start(Methods)  # setup the software
 
 
 class Window(Qt.QMainWindow):
+    searchFinished = QtCore.pyqtSignal(int, object)  # search generation and search that got a new page, emitted from the search threads
+    installProgress = QtCore.pyqtSignal(int, int)  # bytes received and total size of the mod being downloaded
+    installFinished = QtCore.pyqtSignal(bool, object, object)  # whether the mod was installed, names of the dependencies installed and of the missing ones
+    descriptionReady = QtCore.pyqtSignal(str, str, object)  # platform, id and html description of a mod, None if it couldn't be got
+    updatesChecked = QtCore.pyqtSignal(object)  # list of the mods with an update available and their new version
+    updatesInstalled = QtCore.pyqtSignal(int, int)  # number of mods updated and number of updates
     def __init__(self):
         """a class to manage the app and its main window"""
         self.currentProfile = None
         self.currentModData = {}
+        self.currentDescription = None  # html of the description shown, to only set it again when it changed
+        self.searchExecutor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="search")
+        self.searchFuture = None
+        self.searchGeneration = 0  # incremented at each search so the results of older searches are dropped
+        self.currentSearch = None  # state of the search whose results are shown, to request its next pages
+        self.loadingResults = False  # whether a page of results is being requested
+        self.provisionalResults = False  # whether the results shown were filtered from a shorter query while waiting for the real ones
+        self.installExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="install")
+        self.descriptionExecutor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="description")
 
     def start(self):
         """launches the GUI and the app"""
         super().__init__()
+        self.iconDownloader = backendMethods.IconDownloader(Methods)
+        self.prefetcher = backendMethods.Prefetcher(Methods)
+        self.profileModel = profileModel.ProfileModel()
         self.setWindowTitle("Minecraft Mod Manager")
         self.buildUi()
         self.setFocus()
         self.showMaximized()
         self.show()
+        if StartCode.modsRestoreFailed:
+            Qt.QMessageBox.warning(self, lang("error"), lang("modsRestoreFailed"))
     
     def buildUi(self):
         """builds the base UI for the main window"""
@@ -228,19 +247,22 @@ class Window(Qt.QMainWindow):
         self.configureProfileButton.clicked.connect(self.configureProfile)
         self.profileButtonsLayout.addWidget(self.configureProfileButton, 1, 1)
 
+        # update all mods button
+        self.updateModsButton = Qt.QPushButton(lang("updateAllMods"))
+        self.updateModsButton.setFont(Fonts.subtitleFont)
+        self.updateModsButton.setSizePolicy(Qt.QSizePolicy.Expanding, Qt.QSizePolicy.Fixed)
+        self.updateModsButton.setFixedHeight(40)
+        self.updateModsButton.clicked.connect(self.checkUpdates)
+        self.profileButtonsLayout.addWidget(self.updateModsButton, 2, 0, 1, 2)
+
         # separation line
         self.separationLine = customWidgets.SeparationLine()
         self.modsListLayout.addWidget(self.separationLine)
 
-        # scroll area for the mods
-        self.modsScroll = Qt.QScrollArea()
-        self.modsScroll.setWidgetResizable(True)
-        self.modsScroll.setFrameShape(Qt.QFrame.NoFrame)
-        self.modsScrollWidget = Qt.QWidget()
-        self.modsScrollLayout = Qt.QVBoxLayout(self.modsScrollWidget)
-        self.modsScrollLayout.setAlignment(QtCore.Qt.AlignTop)
-        self.modsScroll.setWidget(self.modsScrollWidget)
-        self.modsListLayout.addWidget(self.modsScroll)
+        # list of the installed mods
+        self.modsList = customWidgets.ModListView(self.iconDownloader)
+        self.modsList.wasSelected.connect(self.selectInstalledMod)
+        self.modsListLayout.addWidget(self.modsList)
 
         self.modsListWidget.setVisible(False)
     
@@ -259,7 +281,9 @@ class Window(Qt.QMainWindow):
         self.platformLayout.addWidget(self.platformLabel)
 
         self.platformSelect = Qt.QComboBox()
-        self.platformSelect.addItems(["Modrinth", "CurseForge"])
+        self.platformSelect.addItem("Modrinth", "modrinth")
+        self.platformSelect.addItem("CurseForge", "curseforge")
+        self.platformSelect.addItem(lang("allPlatforms"), "all")
         self.platformSelect.setFont(Fonts.subtitleFont)
         self.platformLayout.addWidget(self.platformSelect)
 
@@ -273,14 +297,19 @@ class Window(Qt.QMainWindow):
         self.searchBar.setFont(Fonts.titleFont)
         self.searchBar.setFixedHeight(40)
         self.searchBar.setPlaceholderText(lang("searchQuery"))
-        self.searchBar.returnPressed.connect(self.searchMod)
+        self.searchBar.returnPressed.connect(lambda: self.searchMod(retry=True))
+        self.searchTimer = QtCore.QTimer(self)  # search once the user stops typing
+        self.searchTimer.setSingleShot(True)
+        self.searchTimer.setInterval(searchDebounceDelay)
+        self.searchTimer.timeout.connect(self.searchMod)
+        self.searchBar.textEdited.connect(lambda: self.searchTimer.start())
         self.searchLayout.addWidget(self.searchBar)
 
         self.searchButton = Qt.QPushButton()
         self.searchButton.setIcon(QtGui.QIcon(str(iconsAssetsDir/"search.png")))
         self.searchButton.setIconSize(QtCore.QSize(25, 25))
         self.searchButton.setFixedSize(QtCore.QSize(40, 40))
-        self.searchButton.clicked.connect(self.searchMod)
+        self.searchButton.clicked.connect(lambda: self.searchMod(retry=True))
         self.searchLayout.addWidget(self.searchButton)
 
         # only show compatible mods or not
@@ -292,14 +321,16 @@ class Window(Qt.QMainWindow):
         self.modSearchLayout.addWidget(self.onlySearchCompatible)
 
         # results list
-        self.resultsScroll = Qt.QScrollArea()
-        self.resultsScroll.setWidgetResizable(True)
-        self.resultsScroll.setFrameShape(Qt.QFrame.NoFrame)
-        self.resultsScrollWidget = Qt.QWidget()
-        self.resultsScrollLayout = Qt.QVBoxLayout(self.resultsScrollWidget)
-        self.resultsScrollLayout.setAlignment(QtCore.Qt.AlignTop)
-        self.resultsScroll.setWidget(self.resultsScrollWidget)
-        self.modSearchLayout.addWidget(self.resultsScroll)
+        self.resultsList = customWidgets.ModListView(self.iconDownloader)
+        self.resultsList.wasSelected.connect(self.selectMod)
+        self.hoveredMod = None
+        self.hoverTimer = QtCore.QTimer(self)  # prefetch the mod under the mouse once it stays on it
+        self.hoverTimer.setSingleShot(True)
+        self.hoverTimer.setInterval(prefetchHoverDelay)
+        self.hoverTimer.timeout.connect(lambda: self.prefetchMods([self.hoveredMod], first=True) if self.hoveredMod else None)
+        self.resultsList.wasHovered.connect(self.onResultHovered)
+        self.resultsList.verticalScrollBar().valueChanged.connect(self.loadMoreResults)
+        self.modSearchLayout.addWidget(self.resultsList)
 
         self.modSearchWidget.setVisible(False)
     
@@ -375,7 +406,7 @@ class Window(Qt.QMainWindow):
         self.modVersionsLayout.addWidget(self.versionsScroll)
 
         # radio buttons for each version
-        self.versionsRadio = customWidgets.ModVersionRadio()
+        self.versionsRadio = customWidgets.ModVersionRadio(self.versionsScroll)
         self.onlyShowCompatible.stateChanged.connect(self.updateVersions)
         self.versionsScrollLayout.addWidget(self.versionsRadio)
 
@@ -404,6 +435,13 @@ class Window(Qt.QMainWindow):
     def setupInterface(self):
         """setup the interface after its creation"""
         self.startedSearching = False
+        self.searchFinished.connect(self.showSearchResults)
+        self.installProgress.connect(self.updateInstallProgress)
+        self.installFinished.connect(self.endModInstall)
+        self.descriptionReady.connect(self.showDescription)
+        self.updatesChecked.connect(self.askUpdates)
+        self.updatesInstalled.connect(self.endUpdates)
+        self.profileModel.profilesChanged.connect(self.onProfilesChanged)
         self.refreshProfiles()
     
     def addProfile(self):
@@ -411,6 +449,7 @@ class Window(Qt.QMainWindow):
         self.addProfilePopup = customWidgets.addProfilePopup()
         log.info(f"opening profile creation screen")
         self.addProfilePopup.exec_()
+        self.profileModel.refresh()
         self.refreshProfiles()
         self.refreshInstalledMods()
     
@@ -422,7 +461,8 @@ class Window(Qt.QMainWindow):
         
         # add all profiles to the list
         self.profileWidgets = []  # list of all profile widgets objects
-        for profileProperties in Methods.getProfiles().values():
+        for profileName in self.profileModel.names():
+            profileProperties = self.profileModel.get(profileName)
             self.profileWidgets.append(customWidgets.ProfileSelect(profileProperties))
             self.profilesScrollLayout.addWidget(self.profileWidgets[-1])
             self.profileWidgets[-1].wasSelected.connect(self.selectProfile)
@@ -439,7 +479,7 @@ class Window(Qt.QMainWindow):
                 self.currentProfile = profileName
                 self.modsListWidget.setVisible(True)
                 self.modSearchWidget.setVisible(True)
-                self.currentProfileProperties = Methods.getProfiles()[profileName]
+                self.currentProfileProperties = self.profileModel.get(profileName)
             else:
                 profile.setSelected(False)
         
@@ -448,100 +488,167 @@ class Window(Qt.QMainWindow):
         self.profileVersionLabel.setText(self.currentProfileProperties["version"])
         self.refreshInstalledMods()
     
-    def searchMod(self):
-        """search for a mod on the selected platform"""
-        #TODO: optimize by not freezing the UI while searching
+    def onProfilesChanged(self):
+        """update the profiles list after a change made outside of the app"""
+        if self.currentProfile is not None and self.profileModel.get(self.currentProfile) is None:  # the selected profile was removed
+            self.currentProfile = None
+            self.modsListWidget.setVisible(False)
+            self.modSearchWidget.setVisible(False)
+            self.modInstallWidget.setVisible(False)
+        self.refreshProfiles()
+        if self.currentProfile is not None:
+            self.currentProfileProperties = self.profileModel.get(self.currentProfile)
+            self.profileLabel.setText(self.currentProfileProperties["name"])
+            self.profileVersionLabel.setText(self.currentProfileProperties["version"])
+    
+    def searchMod(self, retry:bool=False):
+        """search for a mod on the selected platform in the background, dropping any older search,
+        the results already cached are shown right away, retry requests again the search already shown"""
+        self.searchTimer.stop()
         self.startedSearching = True
         modloader = self.currentProfileProperties["modloader"].lower()
         version = self.currentProfileProperties["version"]
-        platform = self.platformSelect.currentText().lower()
-        results = Methods.searchMod(self.searchBar.text(), platform, modloader, self.onlySearchCompatible.isChecked(), version)
-        if platform == "modrinth":
-            mods = Methods.modrinthSearchToMods(results)
-        elif platform == "curseforge":
-            mods = Methods.curseforgeSearchToMods(results)
-        
-        # remove all mods from the list
-        for i in reversed(range(self.resultsScrollLayout.count())):
-            self.resultsScrollLayout.itemAt(i).widget().deleteLater()
-        
-        # add all mods to the list
-        self.modWidgets = []  # list of all mod widgets objects
-        for mod in mods:
-            self.modWidgets.append(customWidgets.SearchModSelect(mod))
-            # download the mod icon
-            if platform == "modrinth":
-                iconUrl = mod["rawData"]["icon_url"]
-            elif platform == "curseforge":
-                if "thumbnailUrl" in mod["rawData"]["logo"]:
-                    iconUrl = mod["rawData"]["logo"]["thumbnailUrl"]
-                else:
-                    iconUrl = None
-            else:
-                iconUrl = None
-                log.error(f"unknown platform: {platform}")
-            threading.Thread(target=Methods.downloadIcon, args=( platform, mod["id"], iconUrl, self.modWidgets[-1])).start()
-            self.resultsScrollLayout.addWidget(self.modWidgets[-1])
-            self.modWidgets[-1].wasSelected.connect(self.selectMod)
+        platform = self.platformSelect.currentData()
+        query, onlyCompatible = self.searchBar.text(), self.onlySearchCompatible.isChecked()
+        search = Methods.getSearch(query, platform, modloader, onlyCompatible, version)
+        if search is self.currentSearch:
+            if not retry:
+                return  # already shown
+            search = Methods.getSearch(query, platform, modloader, onlyCompatible, version, fresh=True)
+        self.searchGeneration += 1
+        if self.searchFuture:
+            self.searchFuture.cancel()  # only works if the previous search didn't start yet, otherwise its results will be dropped
+        self.prefetcher.cancel()
+        self.hoverTimer.stop()
+        self.currentSearch = search
+        self.loadingResults = False
+        mods = Methods.getSearchResults(search)
+        self.provisionalResults = not mods
+        if self.provisionalResults:  # something to show until the first page arrives
+            mods = Methods.filterCachedSearches(query, platform, modloader, onlyCompatible, version) or Methods.searchOffline(query, platform, modloader, onlyCompatible, version)
+        self.resultsList.modsModel.setMods(mods)
+        self.resultsList.scrollToTop()
+        if not self.provisionalResults:
+            self.prefetchMods(mods[:prefetchTopResults])
+            self.loadMoreResults()
+        else:
+            self.loadingResults = True
+            self.searchFuture = self.searchExecutor.submit(self.runSearch, self.searchGeneration, search, searchFirstPageSize)
+    
+    def loadMoreResults(self):
+        """request the next page of results when the list is scrolled near its end, or doesn't fill its space yet"""
+        if self.currentSearch is None or self.loadingResults or Methods.isSearchDone(self.currentSearch):
+            return
+        viewport = self.resultsList.viewport()
+        lastVisible = self.resultsList.indexAt(QtCore.QPoint(1, viewport.height()-1))
+        if not lastVisible.isValid() or lastVisible.row() >= self.resultsList.modsModel.rowCount() - searchFirstPageSize//2:
+            self.loadingResults = True
+            self.searchFuture = self.searchExecutor.submit(self.runSearch, self.searchGeneration, self.currentSearch, searchPageSize)
+    
+    def runSearch(self, generation:int, search:dict, pageSize:int):
+        """request a page of a search in a search thread and send the mods found back to the interface"""
+        if generation != self.searchGeneration:
+            return  # a newer search was started in the meantime
+        try:
+            Methods.searchNextPage(search, pageSize)
+        except Exception as e:
+            log.error(f"error while searching for '{search['query']}' : {e}")
+            for cursor in search["platforms"].values():
+                cursor["done"] = True
+            search["failed"] = True
+        self.searchFinished.emit(generation, search)
+    
+    def showSearchResults(self, generation:int, search:dict):
+        """add the new mods found to the results list, if they come from the latest search"""
+        if generation != self.searchGeneration or search is not self.currentSearch:
+            log.debug("dropped the results of an outdated search")
+            return
+        self.loadingResults = False
+        mods = Methods.getSearchResults(search)
+        if self.provisionalResults:  # replace the mods filtered from another search
+            self.provisionalResults = False
+            self.resultsList.modsModel.setMods(mods)
+            self.prefetchMods(mods[:prefetchTopResults])
+        else:  # the search may have got pages while it wasn't shown, add all the missing mods
+            self.resultsList.modsModel.appendMods(mods[self.resultsList.modsModel.rowCount():])
+        QtCore.QTimer.singleShot(0, self.loadMoreResults)  # once the list is laid out, to know if it fills its space
+    
+    def onResultHovered(self, modData:dict):
+        """wait for the mouse to stay on a search result before prefetching it"""
+        self.hoveredMod = modData
+        self.hoverTimer.start()
+    
+    def prefetchMods(self, mods:list, first:bool=False):
+        """get the data of search results in the background before they're selected"""
+        self.prefetcher.prefetch(mods, self.currentProfileProperties["modloader"].lower(), self.onlyShowCompatible.isChecked(),
+                                 self.currentProfileProperties["version"], first)
+    
+    def clearSearchResults(self):
+        """remove all mods from the results list"""
+        self.resultsList.modsModel.clear()
     
     def selectMod(self, modData:dict):
         """select a mod and deselect the others"""
         self.currentModData = modData
         modId = modData["id"]
         platform = modData["platform"].lower()
-        for mod in self.modWidgets:
-            if mod.modId == modId:
-                self.currentMod = modId
-                self.modInstallWidget.setVisible(True)
-            else:
-                mod.setSelected(False)
-        
-        modRequestData = Methods.getModInfos(modId, modData["platform"])
+        self.currentMod = modId
+        self.modInstallWidget.setVisible(True)
+        self.modsList.clearSelection()
         
         # put the mod infos in the mod description
         self.modNameLabel.setText(modData["name"])
-        iconCacheDir = cacheDir/"modIcons"/platform
-        # download the mod icon
         if platform == "modrinth":
-            iconUrl = modRequestData["icon_url"]
+            iconUrl = modData["rawData"]["icon_url"]
         elif platform == "curseforge":
-            if "logo" in modRequestData:
-                iconUrl = modRequestData["logo"]["thumbnailUrl"]
-            else:
-                iconUrl = None
+            iconUrl = (modData["rawData"].get("logo") or {}).get("thumbnailUrl")
         else:
             iconUrl = None
             log.error(f"unknown platform: {platform}")
-        Methods.downloadIcon(platform, modId, iconUrl)
-        if os.path.exists(iconCacheDir/f"{modId}.png"):
-            self.modDescriptionIcon.setPixmap(QtGui.QPixmap(str(iconCacheDir/f"{modId}.png")).scaled(50, 50))
-        else:
-            self.modDescriptionIcon.setPixmap(QtGui.QPixmap(str(iconsAssetsDir/"noMedia.png")).scaled(50, 50))
-        if platform == "modrinth":
-            self.modDescriptionText.setHtml(Methods.cleanHtml(markdown.markdown(modRequestData["body"])))
-        elif platform == "curseforge":
-            self.modDescriptionText.setHtml(Methods.cleanHtml(Methods.curseforgeRequest(f"mods/{modId}/description")["data"]))
+        self.loadDescription(platform, modId, iconUrl)
         
         # get and display the mod versions
         self.updateVersions()
     
+    def loadDescription(self, platform:str, modId:str, iconUrl:str):
+        """show the icon and the description of a mod from the stores, and get the up to date ones in the background"""
+        self.updateDescriptionIcon(platform, modId)
+        self.iconDownloader.request(platform, modId, iconUrl, lambda: self.updateDescriptionIcon(platform, modId))
+        html = Methods.getStoredDescription(modId, platform)
+        self.modDescriptionText.setHtml(html if html is not None else lang("loadingDescription"))
+        self.currentDescription = html
+        self.descriptionExecutor.submit(self.runDescription, platform, modId)
+    
+    def runDescription(self, platform:str, modId:str):
+        """get the description of a mod in a description thread and send it back to the interface"""
+        html = None
+        try:
+            html = Methods.getModDescription(modId, platform)
+        except Exception as e:
+            log.error(f"error while getting the description of mod {modId} on {platform} : {e}")
+        self.descriptionReady.emit(platform, str(modId), html)
+    
+    def showDescription(self, platform:str, modId:str, html:str):
+        """display the description of a mod if it's still the selected one"""
+        if modId != str(self.currentMod) or platform != self.currentModData.get("platform", "").lower():
+            return
+        if html is None:
+            if self.modDescriptionText.toPlainText() == lang("loadingDescription"):
+                self.modDescriptionText.setHtml(lang("descriptionError"))
+        elif html != self.currentDescription:
+            self.modDescriptionText.setHtml(html)
+        self.currentDescription = html
+    
+    def updateDescriptionIcon(self, platform:str, modId:str):
+        """display the icon of a mod in the description from the thumbnails store"""
+        if str(modId) != str(self.currentMod):
+            return  # another mod was selected while the icon was downloading
+        pixmap = thumbnailStore.Thumbnails.pixmap(platform, modId, 50)
+        self.modDescriptionIcon.setPixmap(pixmap if pixmap else thumbnailStore.Thumbnails.assetPixmap("noMedia.png", 50))
+    
     def refreshInstalledMods(self):
         """refresh the list of installed mods"""
-        # remove all mods from the list
-        for i in reversed(range(self.modsScrollLayout.count())):
-            self.modsScrollLayout.itemAt(i).widget().deleteLater()
-        
-        # get a list of the data of all installed mods
-        mods = Methods.getInstalledMods(self.currentProfile)
-
-        # add all mods to the list
-        self.installedModsWidgets = []  # list of all mod widgets objects
-        for mod in mods:
-            self.installedModsWidgets.append(customWidgets.ModSelect(mod))
-            if not isinstance(mod, str):  # if the mod is not custom jar
-                threading.Thread(target=Methods.downloadIcon, args=(mod["platform"], mod["modId"], mod["iconUrl"], self.installedModsWidgets[-1])).start()
-            self.modsScrollLayout.addWidget(self.installedModsWidgets[-1])
-            self.installedModsWidgets[-1].wasSelected.connect(self.selectInstalledMod)
+        self.modsList.modsModel.setMods(Methods.getInstalledMods(self.currentProfile))
     
     def selectInstalledMod(self, modData:object):
         """select an installed mod and deselect the others, or open popup for custom jar mods"""
@@ -557,28 +664,13 @@ class Window(Qt.QMainWindow):
         self.currentModData = modData
         modId = modData["modId"]
         platform = modData["platform"].lower()
-        for mod in self.installedModsWidgets:
-            if not mod.isCustom:
-                if mod.modId == modId:
-                    self.currentMod = modId
-                    self.modInstallWidget.setVisible(True)
-                else:
-                    mod.setSelected(False)
-        
-        modRequestData = Methods.getModInfos(modId, modData["platform"])
+        self.currentMod = modId
+        self.modInstallWidget.setVisible(True)
+        self.resultsList.clearSelection()
         
         # put the mod infos in the mod description
         self.modNameLabel.setText(modData["modName"])
-        iconCacheDir = cacheDir/"modIcons"/platform
-        Methods.downloadIcon(platform, modId, modData["iconUrl"])
-        if os.path.exists(iconCacheDir/f"{modId}.png"):
-            self.modDescriptionIcon.setPixmap(QtGui.QPixmap(str(iconCacheDir/f"{modId}.png")).scaled(50, 50))
-        else:
-            self.modDescriptionIcon.setPixmap(QtGui.QPixmap(str(iconsAssetsDir/"noMedia.png")).scaled(50, 50))
-        if platform == "modrinth":
-            self.modDescriptionText.setHtml(Methods.cleanHtml(markdown.markdown(modRequestData["body"])))
-        elif platform == "curseforge":
-            self.modDescriptionText.setHtml(Methods.cleanHtml(Methods.curseforgeRequest(f"mods/{modId}/description")["data"]))
+        self.loadDescription(platform, modId, modData["iconUrl"])
         
         # get and display the mod versions
         self.updateVersions()
@@ -586,15 +678,18 @@ class Window(Qt.QMainWindow):
     
     def updateVersions(self):
         """update the list of versions for the selected mod"""
-        #TODO: optimize by dynamically loading the versions in the UI
         self.versionsInfos = Methods.getVersionsInfos(self.currentMod, self.currentModData["platform"].lower(), self.currentProfileProperties["modloader"].lower(), self.onlyShowCompatible.isChecked(), self.currentProfileProperties["version"])
         self.versionsRadio.setVersions(self.versionsInfos, self.currentProfileProperties["version"])
     
     def clearSearch(self):
         """clear the search section"""
         self.searchBar.clear()
-        for i in reversed(range(self.resultsScrollLayout.count())):
-            self.resultsScrollLayout.itemAt(i).widget().deleteLater()
+        self.searchTimer.stop()
+        self.searchGeneration += 1  # drop the results of any running search
+        self.prefetcher.cancel()
+        self.hoverTimer.stop()
+        self.currentSearch = None
+        self.clearSearchResults()
         self.modInstallWidget.setVisible(False)
     
     def removeMod(self):
@@ -604,10 +699,108 @@ class Window(Qt.QMainWindow):
             self.refreshInstalledMods()
     
     def addMod(self):
-        """add a mod"""
-        result = Methods.installCurrentMod(self.currentProfile, self.currentMod, self.currentModData["platform"], self.versionsRadio.getSelectionData())
-        if result is None:
-            self.refreshInstalledMods()
+        """add a mod, downloading it in the background while showing the progress"""
+        modVersionData = self.versionsRadio.getSelectionData()
+        platform = self.currentModData["platform"]
+        if not Methods.confirmModInstall(self.currentProfile, self.currentMod, platform, modVersionData):
+            return
+        self.installDialog = Qt.QProgressDialog(f"{lang('downloading')} {modVersionData['fileName']}", None, 0, 0, self)
+        self.installDialog.setWindowTitle(lang("install"))
+        self.installDialog.setWindowModality(QtCore.Qt.ApplicationModal)
+        self.installDialog.setMinimumDuration(0)
+        self.installDialog.show()
+        profile, modId = self.currentProfile, self.currentMod
+        self.installExecutor.submit(self.runModInstall, profile, modId, platform, modVersionData)
+    
+    def runModInstall(self, profile:str, modId:str, platform:str, modVersionData:dict):
+        """resolve the dependencies of a mod version then install it with them in one batch, in the background"""
+        try:
+            dependencies, missing = Methods.resolveDependencies(profile, modVersionData)
+        except Exception as e:
+            log.error(f"error while resolving the dependencies of mod {modId} : {e}")
+            dependencies, missing = [], []
+        try:
+            if not dependencies:
+                installed = Methods.installCurrentMod(profile, modId, platform, modVersionData, self.installProgress.emit)
+            else:  # the progress counts the mods instead of the bytes
+                installed = Methods.installModVersions(profile, [modVersionData]+dependencies, self.installProgress.emit) == len(dependencies)+1
+        except Exception as e:
+            log.error(f"error while installing mod {modId} in profile {profile} : {e}")
+            self.installFinished.emit(False, [], [])  # always close the install popup
+            return
+        self.installFinished.emit(installed, [dependency["modName"] for dependency in dependencies], missing)
+    
+    def updateInstallProgress(self, receivedSize:int, totalSize:int):
+        """show the progress of the mod download"""
+        if totalSize:
+            self.installDialog.setMaximum(totalSize)
+            self.installDialog.setValue(min(receivedSize, totalSize))
+    
+    def endModInstall(self, installed:bool, dependencies:list, missing:list):
+        """close the download popup and tell the user if the mod was installed, with its dependencies"""
+        self.installDialog.close()
+        if installed:
+            message = lang("modInstalled")
+            if dependencies:
+                message += f"\n\n{lang('dependenciesInstalled')}\n" + "\n".join(dependencies)
+            Qt.QMessageBox.information(self, lang("success"), message)
+        else:
+            Qt.QMessageBox.warning(self, lang("error"), lang("downloadError"))
+        if missing:
+            Qt.QMessageBox.warning(self, lang("error"), f"{lang('dependenciesMissing')}\n" + "\n".join(missing))
+        self.refreshInstalledMods()
+    
+    def checkUpdates(self):
+        """look for updates of all the mods of the profile in the background"""
+        self.installDialog = Qt.QProgressDialog(lang("checkingUpdates"), None, 0, 0, self)
+        self.installDialog.setWindowTitle(lang("updateAllMods"))
+        self.installDialog.setWindowModality(QtCore.Qt.ApplicationModal)
+        self.installDialog.setMinimumDuration(0)
+        self.installDialog.show()
+        profile = self.currentProfile
+        def check():
+            try:
+                self.updatesChecked.emit(Methods.checkProfileUpdates(profile))
+            except Exception as e:
+                log.error(f"error while checking updates of profile {profile} : {e}")
+                self.updatesChecked.emit(None)
+        self.installExecutor.submit(check)
+    
+    def askUpdates(self, updates:list):
+        """ask the user to install the updates found, then install them all in the background"""
+        self.installDialog.close()
+        if updates is None:
+            Qt.QMessageBox.warning(self, lang("error"), lang("downloadError"))
+            return
+        if not updates:
+            Qt.QMessageBox.information(self, lang("updateAllMods"), lang("allModsUpToDate"))
+            return
+        modsList = "\n".join(f"{mod['modName']}: {mod['versionName']} -> {newVersion['versionName']}" for mod, newVersion in updates)
+        confirm = Qt.QMessageBox.question(self, lang("updateAllMods"), f"{len(updates)} {lang('updatesAvailable')}\n\n{modsList}", Qt.QMessageBox.Yes | Qt.QMessageBox.No)
+        if confirm == Qt.QMessageBox.No:
+            return
+        self.installDialog = Qt.QProgressDialog(lang("updatingMods"), None, 0, len(updates), self)
+        self.installDialog.setWindowTitle(lang("updateAllMods"))
+        self.installDialog.setWindowModality(QtCore.Qt.ApplicationModal)
+        self.installDialog.setMinimumDuration(0)
+        self.installDialog.show()
+        profile = self.currentProfile
+        def install():
+            try:
+                self.updatesInstalled.emit(Methods.installModVersions(profile, [newVersion for mod, newVersion in updates], self.installProgress.emit), len(updates))
+            except Exception as e:
+                log.error(f"error while installing updates in profile {profile} : {e}")
+                self.updatesInstalled.emit(0, len(updates))
+        self.installExecutor.submit(install)
+    
+    def endUpdates(self, installed:int, total:int):
+        """close the progress popup and tell the user how many mods were updated"""
+        self.installDialog.close()
+        if installed == total:
+            Qt.QMessageBox.information(self, lang("success"), lang("modsUpdated"))
+        else:
+            Qt.QMessageBox.warning(self, lang("error"), f"{total-installed} {lang('updatesFailed')}")
+        self.refreshInstalledMods()
     
     def configureProfile(self):
         """open the profile configuration popup"""
@@ -620,6 +813,7 @@ class Window(Qt.QMainWindow):
     def renameProfile(self, newName:str):
         """rename the selected profile"""
         Methods.renameProfile(self.currentProfile, newName)
+        self.profileModel.rename(self.currentProfile, newName)
         self.currentProfile = newName
         self.modInstallWidget.setVisible(False)
         self.refreshProfiles()
@@ -627,6 +821,7 @@ class Window(Qt.QMainWindow):
     def removeProfile(self):
         """remove the selected profile"""
         Methods.removeProfile(self.currentProfile)
+        self.profileModel.forget(self.currentProfile)
         self.currentProfile = None
         self.modsListWidget.setVisible(False)
         self.modSearchWidget.setVisible(False)
@@ -667,6 +862,7 @@ class Window(Qt.QMainWindow):
             result = Methods.importProfile(importPath)
             if result is None:
                 Qt.QMessageBox.information(self, lang("success"), lang("profileImported"))
+                self.profileModel.refresh()
                 self.refreshProfiles()
 
 
@@ -0,0 +1,106 @@
+import atomicFiles  # local modules
+from usefulVariables import *  # local variables
+from pathlib import Path
+import tempfile
+import logging
+import hashlib
+import shutil
+import sys
+import os
+
+if sys.platform == "linux":
+    import fcntl
+    FICLONE = 0x40049409  # ioctl to share the blocks of a file on copy-on-write filesystems
+
+log = logging.getLogger(__name__)
+
+
+class JarStore():
+    def __init__(self, folder:Path=jarStoreDir):
+        """a store of mod jars shared by all the profiles, where each file is saved once under its sha1 and hardlinked into the profiles"""
+        self.folder = folder
+
+    def path(self, sha1:str) -> Path:
+        """get the path of a jar in the store from its sha1"""
+        return self.folder/sha1[:2]/f"{sha1}.jar"
+
+    def has(self, sha1:str) -> bool:
+        """check if a jar is in the store"""
+        return bool(sha1) and self.path(sha1.lower()).exists()
+
+    def incomingPath(self, fileName:str) -> Path:
+        """get a path to download a jar to before adding it, on the same filesystem as the store"""
+        incomingDir = self.folder/"incoming"
+        incomingDir.mkdir(parents=True, exist_ok=True)
+        fileDescriptor, path = tempfile.mkstemp(dir=incomingDir, suffix=f"-{fileName}")
+        os.close(fileDescriptor)
+        return Path(path)
+
+    def add(self, path:Path, sha1:str=None) -> str:
+        """move a jar into the store, hashing it if its sha1 isn't known, and return its sha1"""
+        sha1 = sha1.lower() if sha1 else fileSha1(path)
+        storedPath = self.path(sha1)
+        storedPath.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(path, storedPath)
+        return sha1
+
+    def link(self, sha1:str, destination:Path):
+        """put a jar of the store at a destination, as a hardlink when the filesystem allows it, else as a copy"""
+        linkOrCopy(self.path(sha1.lower()), destination)
+
+    def prune(self, referenced:set):
+        """remove the jars whose sha1 isn't referenced by any profile anymore, and leftovers of interrupted downloads,
+        link counts can't tell it as jars may be copies and windows doesn't give them when listing a folder"""
+        if not self.folder.exists():
+            return
+        removed = 0
+        for entry in os.scandir(self.folder):
+            if not entry.is_dir():
+                continue
+            for jar in os.scandir(entry.path):
+                if entry.name == "incoming" or (jar.is_file() and Path(jar.name).stem not in referenced):
+                    try:
+                        os.remove(jar.path)
+                        removed += 1
+                    except OSError as e:
+                        log.warning(f"unable to remove {jar.path} from the jar store : {e}")
+        if removed:
+            log.info(f"removed {removed} unused files from the jar store")
+
+
+def linkOrCopy(source:Path, destination:Path):
+    """put a file at a destination without writing its content again when possible: as a hardlink, else as a reflink, else as a copy,
+    the destination is replaced atomically"""
+    with atomicFiles.atomicPath(destination) as tempPath:
+        os.remove(tempPath)  # a link needs a free name
+        try:
+            os.link(source, tempPath)
+        except OSError:  # hardlinks not supported or across filesystems
+            if not reflink(source, tempPath):
+                shutil.copyfile(source, tempPath)
+
+
+def reflink(source:Path, destination:Path) -> bool:
+    """try to make a copy-on-write clone of a file, returns whether it worked"""
+    if sys.platform != "linux":
+        return False
+    try:
+        with open(source, "rb") as sourceFile, open(destination, "wb") as destinationFile:
+            fcntl.ioctl(destinationFile.fileno(), FICLONE, sourceFile.fileno())
+        return True
+    except OSError:
+        if os.path.exists(destination):
+            os.remove(destination)
+        return False
+
+
+def fileSha1(path:Path) -> str:
+    """compute the sha1 of a file without loading it whole in memory"""
+    hasher = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(downloadChunkSize), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+Jars = JarStore()  # the store shared by the whole app
@@ -0,0 +1,186 @@
+from usefulVariables import *  # local variables
+from pathlib import Path
+import threading
+import logging
+import sqlite3
+import json
+import time
+
+log = logging.getLogger(__name__)
+
+
+class MetadataStore():
+    def __init__(self, path:Path=metadataDbPath):
+        """a persistent sqlite store of the projects and versions metadata of the mods, usable from any thread"""
+        self.path = path
+        self.local = threading.local()  # sqlite connections can't be shared between threads
+        self.schemaLock = threading.Lock()
+        self.schemaReady = False
+        self.fullTextSearch = True  # whether sqlite was built with fts5
+
+    def connection(self) -> sqlite3.Connection:
+        """get the connection of the current thread, opening it if needed"""
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.execute("PRAGMA journal_mode=WAL")  # readers don't wait for writers
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+            with self.schemaLock:
+                if not self.schemaReady:
+                    self.createSchema(connection)
+                    self.schemaReady = True
+        return connection
+
+    def createSchema(self, connection:sqlite3.Connection):
+        """create the tables and indexes if they don't exist yet"""
+        with connection:
+            connection.execute("""CREATE TABLE IF NOT EXISTS projects (
+                platform TEXT NOT NULL, modId TEXT NOT NULL, data TEXT NOT NULL, updatedAt REAL NOT NULL, validators TEXT,
+                PRIMARY KEY (platform, modId))""")
+            if "validators" not in {row[1] for row in connection.execute("PRAGMA table_info(projects)")}:  # stores made before the revalidation
+                connection.execute("ALTER TABLE projects ADD COLUMN validators TEXT")
+            connection.execute("""CREATE TABLE IF NOT EXISTS versions (
+                platform TEXT NOT NULL, versionId TEXT NOT NULL, modId TEXT NOT NULL, data TEXT NOT NULL,
+                PRIMARY KEY (platform, versionId))""")
+            connection.execute("CREATE INDEX IF NOT EXISTS versionsByMod ON versions (platform, modId)")
+            connection.execute("""CREATE TABLE IF NOT EXISTS versionIndexes (
+                platform TEXT NOT NULL, modId TEXT NOT NULL, format INTEGER NOT NULL, data TEXT NOT NULL,
+                PRIMARY KEY (platform, modId))""")
+            connection.execute("""CREATE TABLE IF NOT EXISTS descriptions (
+                platform TEXT NOT NULL, modId TEXT NOT NULL, sourceVersion TEXT NOT NULL, contentHash TEXT NOT NULL, html TEXT NOT NULL,
+                PRIMARY KEY (platform, modId))""")
+            connection.execute("""CREATE TABLE IF NOT EXISTS searchMods (
+                id INTEGER PRIMARY KEY, platform TEXT NOT NULL, modId TEXT NOT NULL, data TEXT NOT NULL, updatedAt REAL NOT NULL,
+                UNIQUE (platform, modId))""")
+        try:
+            with connection:  # the rows of the full text index have the ids of the searchMods rows
+                connection.execute("CREATE VIRTUAL TABLE IF NOT EXISTS searchIndex USING fts5(name, author, summary, loaders, gameVersions)")
+        except sqlite3.OperationalError as e:
+            self.fullTextSearch = False
+            log.warning(f"full text search not available, mods won't be searchable offline : {e}")
+        log.debug(f"metadata store ready at {self.path}")
+
+    def getProject(self, platform:str, modId:str) -> dict:
+        """get the stored data of a project, or None if it isn't stored"""
+        row = self.connection().execute("SELECT data FROM projects WHERE platform = ? AND modId = ?", (platform.lower(), str(modId))).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def getProjectEntry(self, platform:str, modId:str) -> tuple:
+        """get the stored data of a project with the time it was stored or revalidated at and the validators of its response,
+        or None if it isn't stored"""
+        row = self.connection().execute("SELECT data, updatedAt, validators FROM projects WHERE platform = ? AND modId = ?", (platform.lower(), str(modId))).fetchone()
+        return (json.loads(row[0]), row[1], json.loads(row[2]) if row[2] else None) if row else None
+
+    def putProject(self, platform:str, modId:str, data:dict, validators:dict=None):
+        """store or replace the data of a project, with the etag and last modified date of the response it came from"""
+        with self.connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO projects (platform, modId, data, updatedAt, validators) VALUES (?, ?, ?, ?, ?)",
+                               (platform.lower(), str(modId), json.dumps(data), time.time(), json.dumps(validators) if validators else None))
+
+    def touchProject(self, platform:str, modId:str):
+        """mark the stored data of a project as up to date after the platform said it didn't change"""
+        with self.connection() as connection:
+            connection.execute("UPDATE projects SET updatedAt = ? WHERE platform = ? AND modId = ?", (time.time(), platform.lower(), str(modId)))
+
+    def expireProject(self, platform:str, modId:str):
+        """mark the stored data of a project as too old, so it's revalidated with its validators the next time it's read"""
+        with self.connection() as connection:
+            connection.execute("UPDATE projects SET updatedAt = 0 WHERE platform = ? AND modId = ?", (platform.lower(), str(modId)))
+
+    def getVersions(self, platform:str, modId:str) -> list:
+        """get the stored data of all the versions of a mod in one query"""
+        rows = self.connection().execute("SELECT data FROM versions WHERE platform = ? AND modId = ?", (platform.lower(), str(modId))).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def getVersionIds(self, platform:str, modId:str) -> set:
+        """get the ids of the stored versions of a mod, without loading their data"""
+        rows = self.connection().execute("SELECT versionId FROM versions WHERE platform = ? AND modId = ?", (platform.lower(), str(modId))).fetchall()
+        return {row[0] for row in rows}
+
+    def getVersion(self, platform:str, versionId:str) -> dict:
+        """get the stored data of a version, or None if it isn't stored"""
+        row = self.connection().execute("SELECT data FROM versions WHERE platform = ? AND versionId = ?", (platform.lower(), str(versionId))).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def putVersions(self, platform:str, modId:str, versions:dict):
+        """store or replace the data of versions of a mod, given as a dictionary with the version ids as keys"""
+        with self.connection() as connection:
+            connection.executemany("INSERT OR REPLACE INTO versions (platform, versionId, modId, data) VALUES (?, ?, ?, ?)",
+                                   [(platform.lower(), str(versionId), str(modId), json.dumps(data)) for versionId, data in versions.items()])
+
+    def deleteVersions(self, platform:str, versionIds:set):
+        """remove stored versions that don't exist anymore"""
+        with self.connection() as connection:
+            connection.executemany("DELETE FROM versions WHERE platform = ? AND versionId = ?", [(platform.lower(), str(versionId)) for versionId in versionIds])
+
+    def getVersionIndex(self, platform:str, modId:str, format:int) -> dict:
+        """get the stored versions index of a mod, or None if it isn't stored or was built with another format"""
+        row = self.connection().execute("SELECT data FROM versionIndexes WHERE platform = ? AND modId = ? AND format = ?", (platform.lower(), str(modId), format)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def deleteVersionIndex(self, platform:str, modId:str):
+        """remove the stored versions index of a mod so it's built again"""
+        with self.connection() as connection:
+            connection.execute("DELETE FROM versionIndexes WHERE platform = ? AND modId = ?", (platform.lower(), str(modId)))
+
+    def putVersionIndex(self, platform:str, modId:str, format:int, data:dict):
+        """store or replace the versions index of a mod"""
+        with self.connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO versionIndexes (platform, modId, format, data) VALUES (?, ?, ?, ?)",
+                               (platform.lower(), str(modId), format, json.dumps(data)))
+
+    def getDescription(self, platform:str, modId:str) -> tuple:
+        """get the stored rendered description of a mod with the version of its source and the hash of its content, or None if it isn't stored"""
+        row = self.connection().execute("SELECT html, sourceVersion, contentHash FROM descriptions WHERE platform = ? AND modId = ?", (platform.lower(), str(modId))).fetchone()
+        return tuple(row) if row else None
+
+    def putDescription(self, platform:str, modId:str, sourceVersion:str, contentHash:str, html:str):
+        """store or replace the rendered description of a mod"""
+        with self.connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO descriptions (platform, modId, sourceVersion, contentHash, html) VALUES (?, ?, ?, ?, ?)",
+                               (platform.lower(), str(modId), sourceVersion, contentHash, html))
+
+    def putSearchEntries(self, entries:list):
+        """index mods for the offline search, each entry has the mod data shown in the search results, its summary, loaders and game versions"""
+        if not self.fullTextSearch or not entries:
+            return
+        with self.connection() as connection:
+            for entry in entries:
+                mod = entry["mod"]
+                platform, modId = mod["platform"].lower(), str(mod["id"])
+                row = connection.execute("SELECT id, data FROM searchMods WHERE platform = ? AND modId = ?", (platform, modId)).fetchone()
+                if row is not None and not mod["author"]:  # the project data of some platforms doesn't have the author, keep the one from the search
+                    mod = dict(mod, author=json.loads(row[1])["author"])
+                connection.execute("""INSERT INTO searchMods (platform, modId, data, updatedAt) VALUES (?, ?, ?, ?)
+                                      ON CONFLICT (platform, modId) DO UPDATE SET data = excluded.data, updatedAt = excluded.updatedAt""",
+                                   (platform, modId, json.dumps(mod), time.time()))
+                rowId = row[0] if row else connection.execute("SELECT id FROM searchMods WHERE platform = ? AND modId = ?", (platform, modId)).fetchone()[0]
+                connection.execute("DELETE FROM searchIndex WHERE rowid = ?", (rowId,))
+                connection.execute("INSERT INTO searchIndex (rowid, name, author, summary, loaders, gameVersions) VALUES (?, ?, ?, ?, ?, ?)",
+                                   (rowId, mod["name"], mod["author"] or "", entry["summary"] or "",
+                                    "|" + "|".join(loader.lower() for loader in entry["loaders"]) + "|", "|" + "|".join(entry["gameVersions"]) + "|"))
+
+    def searchMods(self, query:str, platforms:list, modloader:str, version:str=None, limit:int=50) -> list:
+        """search the indexed mods by name, author and summary, the best matches first, returns the mods data shown in the search results"""
+        if not self.fullTextSearch:
+            return []
+        words = ['"' + word.replace('"', '""') + '"*' for word in query.split()]  # every word, as a prefix
+        conditions = [f"searchMods.platform IN ({', '.join('?' for _ in platforms)})", "searchIndex.loaders LIKE ?"]
+        params = [platform.lower() for platform in platforms] + [f"%|{modloader.lower()}|%"]
+        if version:
+            conditions.append("searchIndex.gameVersions LIKE ?")
+            params.append(f"%|{version}|%")
+        if words:
+            conditions.append("searchIndex MATCH ?")
+            params.append(f"{{name author summary}} : ({' AND '.join(words)})")
+            order = "bm25(searchIndex, 10.0, 3.0, 1.0, 0.0, 0.0)"  # a match in the name counts more than in the summary
+        else:
+            order = "searchMods.updatedAt DESC"
+        rows = self.connection().execute(f"""SELECT searchMods.data FROM searchIndex JOIN searchMods ON searchMods.id = searchIndex.rowid
+                                             WHERE {' AND '.join(conditions)} ORDER BY {order} LIMIT ?""", params + [limit]).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+
+Metadata = MetadataStore()  # the store shared by the whole app
@@ -0,0 +1,125 @@
+import atomicFiles  # local modules
+from usefulVariables import *  # local variables
+from pathlib import Path
+import threading
+import logging
+import json
+import os
+
+log = logging.getLogger(__name__)
+
+
+class ProfileManifests():
+    def __init__(self, folder:Path=profilesDir):
+        """one manifest file per profile listing all its installed mods, so a profile is listed with a single file read,
+        kept up to date on every install, removal and rename, usable from any thread"""
+        self.folder = folder
+        self.lock = threading.Lock()  # the mods of a profile can be installed concurrently
+
+    def path(self, profile:str) -> Path:
+        """get the path of the manifest of a profile"""
+        return self.folder/profile/profileManifestName
+
+    def get(self, profile:str) -> dict:
+        """get the manifest of a profile, with the mods data by platform and mod id and the custom jar names,
+        building it from the mod folders if it's missing or outdated"""
+        try:
+            with open(self.path(profile), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("format") == profileManifestFormat:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        with self.lock:
+            return self.rebuild(profile)
+
+    def rebuild(self, profile:str) -> dict:
+        """scan the mod folders of a profile to build its manifest again, the lock must be held"""
+        profilePath = self.folder/profile
+        manifest = {"format": profileManifestFormat, "mods": {}, "jars": []}
+        for platform in availablePlatforms:
+            if not (profilePath/platform).exists():
+                continue
+            for entry in os.scandir(profilePath/platform):
+                if not entry.is_dir():
+                    continue
+                try:
+                    with open(Path(entry.path)/"properties.json", "r", encoding="utf-8") as f:
+                        manifest["mods"][self.modKey(platform, entry.name)] = json.load(f)
+                except (OSError, ValueError) as e:
+                    log.warning(f"unable to read the properties of mod {entry.name} in profile {profile} : {e}")
+        if (profilePath/"jar").exists():
+            manifest["jars"] = sorted(entry.name for entry in os.scandir(profilePath/"jar") if entry.is_file())
+        if profilePath.exists():
+            self.write(profile, manifest)
+        log.info(f"built the manifest of profile {profile} with {len(manifest['mods'])} mods and {len(manifest['jars'])} jars")
+        return manifest
+
+    def write(self, profile:str, manifest:dict):
+        """replace the manifest of a profile atomically"""
+        atomicFiles.atomicWrite(self.path(profile), json.dumps(manifest).encode("utf-8"))
+
+    def update(self, profile:str, change):
+        """apply a change to the manifest of a profile and save it, the change function gets the manifest to modify"""
+        with self.lock:
+            try:
+                with open(self.path(profile), "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+                if manifest.get("format") != profileManifestFormat:
+                    raise ValueError("outdated manifest format")
+            except (OSError, ValueError):
+                manifest = self.rebuild(profile)
+            change(manifest)
+            self.write(profile, manifest)
+
+    def referencedJars(self) -> set:
+        """get the sha1 of the jars of the mods installed in all the profiles"""
+        referenced = set()
+        if not self.folder.exists():
+            return referenced
+        for entry in os.scandir(self.folder):
+            if entry.is_dir() and (Path(entry.path)/"properties.json").exists():
+                for modData in self.get(entry.name)["mods"].values():
+                    sha1 = (modData.get("hashes") or {}).get("sha1")
+                    if sha1:
+                        referenced.add(sha1.lower())
+        return referenced
+
+    def modKey(self, platform:str, modId:str) -> str:
+        """get the key of a mod in a manifest"""
+        return f"{platform.lower()}/{modId}"
+
+    def setMod(self, profile:str, modData:dict):
+        """add or replace an installed mod in the manifest of a profile"""
+        self.update(profile, lambda manifest: manifest["mods"].__setitem__(self.modKey(modData["platform"], modData["modId"]), modData))
+
+    def removeMod(self, profile:str, platform:str, modId:str):
+        """remove an installed mod from the manifest of a profile"""
+        self.update(profile, lambda manifest: manifest["mods"].pop(self.modKey(platform, modId), None))
+
+    def addJar(self, profile:str, fileName:str):
+        """add a custom jar to the manifest of a profile"""
+        def change(manifest:dict):
+            if fileName not in manifest["jars"]:
+                manifest["jars"].append(fileName)
+                manifest["jars"].sort()
+        self.update(profile, change)
+
+    def removeJar(self, profile:str, fileName:str):
+        """remove a custom jar from the manifest of a profile"""
+        def change(manifest:dict):
+            if fileName in manifest["jars"]:
+                manifest["jars"].remove(fileName)
+        self.update(profile, change)
+
+    def renameJar(self, profile:str, fileName:str, newFileName:str):
+        """rename a custom jar in the manifest of a profile"""
+        def change(manifest:dict):
+            if fileName in manifest["jars"]:
+                manifest["jars"].remove(fileName)
+            manifest["jars"].append(newFileName)
+            manifest["jars"].sort()
+        self.update(profile, change)
+
+
+Manifests = ProfileManifests()  # the manifests shared by the whole app
@@ -0,0 +1,91 @@
+from usefulVariables import *  # local variables
+from PyQt5 import QtCore
+from pathlib import Path
+import logging
+import json
+import os
+
+log = logging.getLogger(__name__)
+
+
+class ProfileModel(QtCore.QObject):
+    profilesChanged = QtCore.pyqtSignal()  # emitted when a profile was added, removed or modified outside of the app
+    def __init__(self, folder:Path=profilesDir):
+        """the properties of all the profiles loaded once and kept in memory, following the changes made to the profiles folder,
+        only from the GUI thread"""
+        super().__init__()
+        self.folder = folder
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.profiles = {}  # profile name -> properties
+        self.watcher = QtCore.QFileSystemWatcher()
+        self.watcher.directoryChanged.connect(self.onFolderChanged)
+        self.watcher.fileChanged.connect(self.onPropertiesChanged)
+        self.load()
+
+    def load(self):
+        """read the properties of all the profiles and start watching them"""
+        self.profiles = {}
+        for name in sorted(self.listFolder()):
+            self.readProfile(name)
+        self.watcher.addPath(str(self.folder))
+        log.info(f"loaded {len(self.profiles)} profiles")
+
+    def listFolder(self) -> list:
+        """list the names of the profile folders"""
+        return [entry.name for entry in os.scandir(self.folder) if entry.is_dir() and (Path(entry.path)/"properties.json").exists()]
+
+    def readProfile(self, name:str) -> bool:
+        """read the properties of one profile into the model and watch them, returns whether they changed"""
+        propertiesPath = self.folder/name/"properties.json"
+        try:
+            with open(propertiesPath, "r", encoding="utf-8") as f:
+                properties = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning(f"unable to read the properties of profile {name} : {e}")
+            return False
+        if str(propertiesPath) not in self.watcher.files():
+            self.watcher.addPath(str(propertiesPath))  # replacing a file stops its watch
+        if self.profiles.get(name) == properties:
+            return False
+        self.profiles[name] = properties
+        return True
+
+    def get(self, name:str) -> dict:
+        """get the properties of a profile, or None if it doesn't exist"""
+        return self.profiles.get(name)
+
+    def names(self) -> list:
+        """get the names of all the profiles sorted alphabetically"""
+        return sorted(self.profiles, key=str.lower)
+
+    def refresh(self) -> bool:
+        """add the new profile folders and drop the removed ones without reading the others again, returns whether something changed"""
+        names = set(self.listFolder())
+        removed = [name for name in self.profiles if name not in names]
+        for name in removed:
+            self.forget(name)
+        added = [name for name in names if name not in self.profiles and self.readProfile(name)]
+        return bool(removed or added)
+
+    def rename(self, currentName:str, newName:str):
+        """move a profile to its new name after the app renamed it"""
+        self.forget(currentName)
+        self.readProfile(newName)
+
+    def forget(self, name:str):
+        """remove a profile from the model and stop watching it"""
+        self.profiles.pop(name, None)
+        self.watcher.removePath(str(self.folder/name/"properties.json"))
+
+    def onFolderChanged(self, path:str):
+        """a profile folder was added, removed or renamed"""
+        if self.refresh():
+            self.profilesChanged.emit()
+
+    def onPropertiesChanged(self, path:str):
+        """the properties file of a profile was modified"""
+        name = Path(path).parent.name
+        if not Path(path).exists():
+            return  # removed or being replaced, the folder change or the next write will tell
+        if self.readProfile(name):
+            self.profilesChanged.emit()
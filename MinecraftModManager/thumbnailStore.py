@@ -0,0 +1,113 @@
+import atomicFiles  # local modules
+from usefulVariables import *  # local variables
+from PyQt5 import QtGui, QtCore
+from pathlib import Path
+import threading
+import logging
+import os
+
+log = logging.getLogger(__name__)
+
+
+class ThumbnailStore():
+    def __init__(self, folder:Path=thumbnailsDir, sizes:tuple=thumbnailSizes, maxSize:int=thumbnailsMaxSize):
+        """a persistent store of mod icons already scaled to the sizes used by the interface, evicting the least recently used ones above a size limit"""
+        self.folder = folder
+        self.sizes = sizes
+        self.maxSize = maxSize
+        self.lock = threading.Lock()
+        self.totalSize = None  # computed on the first store
+
+    def path(self, platform:str, id:str, size:int) -> Path:
+        """get the path of a thumbnail of a mod icon"""
+        return self.folder/platform.lower()/f"{id}_{size}.png"
+
+    def has(self, platform:str, id:str) -> bool:
+        """check if the thumbnails of a mod icon are all stored"""
+        return all(self.path(platform, id, size).exists() for size in self.sizes)
+
+    def store(self, platform:str, id:str, iconData:bytes) -> bool:
+        """decode a full size icon and store its thumbnails, can be used from any thread"""
+        image = QtGui.QImage()
+        if not image.loadFromData(iconData):
+            log.warning(f"unable to decode the icon of mod {id} on {platform}")
+            return False
+        (self.folder/platform.lower()).mkdir(parents=True, exist_ok=True)
+        addedSize = 0
+        for size in self.sizes:
+            thumbnail = image.scaled(size, size, QtCore.Qt.IgnoreAspectRatio, QtCore.Qt.SmoothTransformation)
+            path = self.path(platform, id, size)
+            try:
+                with atomicFiles.atomicPath(path) as tempPath:  # the thumbnail only appears once complete
+                    if not thumbnail.save(str(tempPath), "PNG"):
+                        raise OSError("the image couldn't be encoded")
+                addedSize += path.stat().st_size
+            except OSError as e:
+                log.warning(f"unable to save the {size}px thumbnail of mod {id} on {platform} : {e}")
+        self.addSize(addedSize)
+        return True
+
+    def pixmap(self, platform:str, id:str, size:int) -> QtGui.QPixmap:
+        """get a thumbnail as a pixmap from the memory cache or the disk, or None if it isn't stored, only from the GUI thread"""
+        key = f"thumbnail/{platform.lower()}/{id}/{size}"
+        pixmap = QtGui.QPixmapCache.find(key)
+        if pixmap is not None and not pixmap.isNull():
+            return pixmap
+        path = self.path(platform, id, size)
+        if not path.exists():
+            return None
+        pixmap = QtGui.QPixmap(str(path))
+        QtGui.QPixmapCache.insert(key, pixmap)
+        try:
+            os.utime(path)  # mark as recently used for the eviction
+        except OSError:
+            pass
+        return pixmap
+
+    def assetPixmap(self, name:str, size:int) -> QtGui.QPixmap:
+        """get an icon from the assets scaled to a size, decoded only once, only from the GUI thread"""
+        key = f"asset/{name}/{size}"
+        pixmap = QtGui.QPixmapCache.find(key)
+        if pixmap is None or pixmap.isNull():
+            pixmap = QtGui.QPixmap(str(iconsAssetsDir/name)).scaled(size, size)
+            QtGui.QPixmapCache.insert(key, pixmap)
+        return pixmap
+
+    def addSize(self, addedSize:int):
+        """keep track of the store size, evicting the oldest thumbnails when it gets too big"""
+        with self.lock:
+            if self.totalSize is None:
+                self.totalSize = sum(entry.stat().st_size for entry in self.listThumbnails())
+            else:
+                self.totalSize += addedSize
+            if self.totalSize > self.maxSize:
+                self.evict()
+
+    def listThumbnails(self) -> list:
+        """list the directory entries of all the stored thumbnails"""
+        entries = []
+        if self.folder.exists():
+            for platformDir in os.scandir(self.folder):
+                if platformDir.is_dir():
+                    entries.extend(entry for entry in os.scandir(platformDir.path) if entry.is_file() and entry.name.endswith(".png"))
+        return entries
+
+    def evict(self):
+        """remove the least recently used thumbnails until the store is back under 80% of its size limit"""
+        entries = sorted(self.listThumbnails(), key=lambda entry: entry.stat().st_mtime)
+        self.totalSize = sum(entry.stat().st_size for entry in entries)
+        removed = 0
+        for entry in entries:
+            if self.totalSize <= self.maxSize*0.8:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self.totalSize -= size
+                removed += 1
+            except OSError as e:
+                log.warning(f"unable to evict thumbnail {entry.path} : {e}")
+        log.info(f"evicted {removed} thumbnails from the store")
+
+
+Thumbnails = ThumbnailStore()  # the store shared by the whole app
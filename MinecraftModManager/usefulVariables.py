@@ -23,15 +23,54 @@ iconsAssetsDir = localPath/"assets"/"icons"/"dark" if darkdetect.isDark() else l
 profilesDir = appDataDir/"profiles"  # path to the profiles folder
 cacheDir = appDataDir/"cache"  # path to the cache folder
 logDir = appDataDir/"logs"  # path to the logs folder
+metadataDbPath = appDataDir/"metadata.db"  # path to the database of the mods metadata, kept between launches unlike the cache
+jarStoreDir = appDataDir/"jarStore"  # path to the mod jars shared by all the profiles
+thumbnailsDir = appDataDir/"thumbnails"  # path to the scaled mod icons, kept between launches unlike the cache
 
 minecraftAppdataPath = Path(minecraft_launcher_lib.utils.get_minecraft_directory())
 minecraftModsPath = minecraftAppdataPath/"mods"
+previousModsPath = minecraftAppdataPath/"mods.previous"  # the user's mods folder put aside while a profile is launched, next to it to be renamed instantly
+appliedModsPath = minecraftAppdataPath/"mods.applied"  # the mods folder of the last launched profile, kept to only apply the differences next time
+modsSwapMarker = appDataDir/"modsSwap.json"  # exists while the user's mods folder is put aside, to restore it at the next start after a crash
 
 modrinthApi = "https://api.modrinth.com/v2"
 curseForgeApi = "http://mmm.ilwan.hackclub.app/curseforge"
 
 availablePlatforms = ["modrinth", "curseforge"]
 
+httpConnectTimeout = 5  # seconds to wait for a connection to a server
+httpReadTimeout = 30  # seconds to wait for data from a server before giving up
+httpRetries = 3  # number of retries on server errors and connection resets
+httpBackoffFactor = 0.5  # the delay between retries grows exponentially from this factor
+httpPoolSize = 16  # number of alive connections kept per host
+downloadChunkSize = 256*1024  # bytes read at once when downloading a file, so big files don't fill the memory
+
+metadataMaxAge = 3600  # seconds before the stored data of a project is requested again to look for new versions
+modrinthVersionsBatchSize = 100  # number of version ids requested at once to modrinth, keeps the url under the length limits
+curseforgeFilesPageSize = 50  # number of files per page requested to curseforge, the maximum allowed
+versionsIndexFormat = 3  # to increase when the structure of the versions index changes, so the stored ones are rebuilt
+parallelPageRequests = 6  # number of pages or chunks of a list requested at the same time
+parallelDownloads = 4  # number of mod jars downloaded at the same time
+thumbnailSizes = (64, 50)  # sizes of the mod icons displayed in the interface
+thumbnailsMaxSize = 32*1024*1024  # bytes of thumbnails kept before evicting the least recently used ones
+iconDownloadWorkers = 6  # number of icons downloaded at the same time
+prefetchWorkers = 2  # number of mods whose data is prefetched at the same time, low to leave the network to what the user asked for
+prefetchPageRequests = 2  # number of version pages requested at the same time by the prefetcher, apart from the ones the user waits for
+prefetchTopResults = 5  # number of the first search results prefetched, as they're the most likely to be selected
+prefetchQueueSize = 8  # number of mods waiting to be prefetched at most, the oldest hovered ones are dropped first
+prefetchHoverDelay = 300  # milliseconds the mouse has to stay on a search result before it's prefetched
+searchFirstPageSize = 20  # number of mods asked per platform for the first page of a search, small so it shows up fast
+searchPageSize = 50  # number of mods asked per platform for the next pages of a search, when scrolling down
+searchMaxRequestsPerPage = 3  # requests made on a platform to fill a page when some hits are filtered out
+searchMaxOffset = 10000  # curseforge doesn't give results past this position
+searchCacheSize = 20  # number of searches kept with their results, the least recently used ones are forgotten first
+searchCacheMaxAge = 300  # seconds before a cached search is requested again
+searchOfflineLimit = 50  # number of mods found at most when searching without network
+searchDebounceDelay = 350  # milliseconds without typing before searching what's in the search bar
+versionsPageSize = 30  # number of mod versions shown at once, more are shown when scrolling down
+profileManifestName = "manifest.json"  # file listing the installed mods in each profile folder
+profileManifestFormat = 1  # to increase when the structure of the profile manifests changes, so they are rebuilt
+
 appVersion = "0.1.0"
 
 class Fonts():
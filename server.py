@@ -13,7 +13,7 @@ load_dotenv(ENV_PATH)
 CURSEFORGE_API_BASE_URL = "https://api.curseforge.com/v1"
 HEADERS = {"x-api-key": os.getenv("CURSEFORGE_API_KEY")}
 
-@app.route("/curseforge/<path:endpoint>", methods=["GET"])
+@app.route("/curseforge/<path:endpoint>", methods=["GET", "POST"])
 def proxyToCurseforge(endpoint):
     """interact with the curseforge api using the key"""
     # target url
@@ -27,10 +27,18 @@ def proxyToCurseforge(endpoint):
         # send request to curseforge
         if method == "GET":
             response = requests.get(url, headers=HEADERS, params=query_params)
+        elif method == "POST":  # batch endpoints, with a json body
+            response = requests.post(url, headers=HEADERS, params=query_params, json=request.get_json(silent=True))
         else:
             return jsonify({"error": "HTTP method not supported"}), 405
         # return query results to the client
-        return jsonify(response.json()), response.status_code
+        result = jsonify(response.json())
+        result.status_code = response.status_code
+        if method == "GET" and response.status_code == 200:
+            # let the client revalidate the data it already has, answering 304 without the body when it didn't change
+            result.add_etag()
+            result = result.make_conditional(request)
+        return result
 
     except requests.exceptions.RequestException as e:
         # send an error if needed